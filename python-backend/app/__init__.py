@@ -1,21 +1,71 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from config import Config
+from app.cache import TTLCache
+from app.passwords import PasswordHasher
+from app.storage import ContentStore
+from app.page_cache import PageCache
+from app.ratelimit import RateLimiter
+from app.tiered_cache import TieredCache
+from app.metrics import (Metrics, cache_collector, scheduler_collector, contact_buffer_collector,
+                         ratelimit_collector)
+from app import sqlite_profile, nplusone
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': sqlite_profile.RoutingSession})
 login = LoginManager()
 login.login_view = 'auth.login'
+# Identity snapshots served to Flask-Login without a query per request
+user_cache = TTLCache()
+hasher = PasswordHasher()
+metrics = Metrics()
+document_store = ContentStore()
+page_cache = PageCache()
+limiter = RateLimiter()
+# Query results and list responses, invalidated by committed writes
+cache = TieredCache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    split_sqlite = sqlite_profile.configure(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    if split_sqlite:
+        sqlite_profile.install_pragmas(app, db)
+    # Flask-Migrate drags in Alembic; only the `flask db` commands need it,
+    # so skip it unless the app is being loaded by the CLI
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
     login.init_app(app)
+    user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    hasher.init_app(app)
+    document_store.init_app(app)
+    page_cache.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    # After metrics so rejected requests are still counted and timed
+    limiter.init_app(app)
+    metrics.add_collector('user_cache', cache_collector('user_cache', user_cache))
+    metrics.add_collector('page_cache', cache_collector('page_cache', page_cache.pages))
+    metrics.add_collector('cache', cache_collector('query_cache', cache))
+    metrics.add_collector('ratelimit', ratelimit_collector(limiter))
+    nplusone.init_app(app)
+
+    from app.directory import directory
+    directory.configure(app)
+    metrics.add_collector('directory', cache_collector('directory_search', directory.results))
+
+    from app.contact_buffer import contact_buffer
+    contact_buffer.init_app(app)
+    metrics.add_collector('contact_buffer', contact_buffer_collector(contact_buffer))
+
+    if app.config['CONTENT_SCHEDULER_ENABLED']:
+        from app.scheduler import scheduler
+        scheduler.init_app(app)
+        metrics.add_collector('content_scheduler', scheduler_collector(scheduler))
 
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp)
@@ -26,6 +76,9 @@ def create_app(config_class=Config):
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.cli import register_commands
+    register_commands(app)
+
     # This route is no longer needed as it's defined in the main blueprint
     # @app.route('/')
     # def index():
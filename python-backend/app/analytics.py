@@ -0,0 +1,258 @@
+"""Multi-year financial analytics computed from ``YearlyFinancial``.
+
+The yearly figures and each year's ``RevenueBreakdown`` shares are loaded in
+one joined query and turned into column arrays, and every derived series
+(growth, margin, rolling means, year-over-year deltas, revenue per segment)
+is computed over the whole history in batched array operations.  Growth and
+deltas are only defined between consecutive years.  Rolling means cover the
+last ``window`` recorded years and are computed before the year range is
+applied, so the first year shown still averages over the years before it.
+
+Results are cached per process under the tables' data version (the same
+``count``/``max`` aggregate the conditional GET uses), so any write is
+picked up by the next request without explicit invalidation.
+
+NumPy is used when installed; otherwise the same operations run in plain
+Python, which is fast enough for the few dozen years this table holds.
+"""
+import math
+from bisect import bisect_left
+
+from app import db
+from app.cache import TTLCache
+from app.models import RevenueBreakdown, YearlyFinancial
+
+SERIES = ('revenue', 'profit', 'reportedGrowth', 'growth', 'margin', 'revenueDelta',
+          'profitDelta', 'marginDelta', 'revenueRolling', 'profitRolling', 'marginRolling',
+          'segments')
+DEFAULT_SERIES = ('revenue', 'profit', 'growth', 'margin', 'revenueRolling')
+
+# (data version, window) -> computed columns; the version changes on every write
+_cache = TTLCache(maxsize=32, ttl=3600)
+
+
+class AnalyticsError(ValueError):
+    """Raised for invalid analytics parameters."""
+
+
+def parse_series(raw):
+    if not raw:
+        return DEFAULT_SERIES
+    names = tuple(name.strip() for name in raw.split(',') if name.strip())
+    unknown = [name for name in names if name not in SERIES]
+    if unknown:
+        raise AnalyticsError(f"Unknown metric(s): {', '.join(unknown)}; "
+                             f"expected any of: {', '.join(SERIES)}")
+    return names
+
+
+def report(version, series=DEFAULT_SERIES, start=None, end=None, window=3):
+    """Return the analytics payload for ``start``..``end`` (inclusive years)."""
+    if window < 1:
+        raise AnalyticsError('window must be at least 1')
+    if start is not None and end is not None and start > end:
+        raise AnalyticsError("'from' must not be after 'to'")
+
+    key = (version, window)
+    columns = _cache.get(key)
+    if columns is None:
+        columns = compute(load_columns(), window)
+        _cache.set(key, columns)
+
+    years = columns['years']
+    lo = 0 if start is None else bisect_left(years, start)
+    hi = len(years) if end is None else bisect_left(years, end + 1)
+    selected = years[lo:hi]
+
+    payload = {
+        'years': selected,
+        'window': window,
+        'metrics': {name: columns[name][lo:hi] for name in series if name != 'segments'},
+        'summary': _summary(selected, columns['revenue'][lo:hi], columns['profit'][lo:hi]),
+    }
+    if 'segments' in series:
+        payload['segments'] = {
+            category: {'percentage': values['percentage'][lo:hi], 'revenue': values['revenue'][lo:hi]}
+            for category, values in columns['segments'].items()
+        }
+    return payload
+
+
+def load_columns():
+    """One query: every year's figures joined with its revenue breakdown."""
+    rows = db.session.execute(
+        db.select(YearlyFinancial.year, YearlyFinancial.revenue, YearlyFinancial.profit,
+                  YearlyFinancial.growth_percentage, RevenueBreakdown.category,
+                  RevenueBreakdown.percentage)
+        .outerjoin(RevenueBreakdown, RevenueBreakdown.year == YearlyFinancial.year)
+        .order_by(YearlyFinancial.year, YearlyFinancial.id)).all()
+
+    years, revenue, profit, reported = [], [], [], []
+    shares = {}
+    for row in rows:
+        if not years or years[-1] != row.year:
+            years.append(row.year)
+            revenue.append(row.revenue)
+            profit.append(row.profit)
+            reported.append(row.growth_percentage)
+        if row.category is not None:
+            shares.setdefault(row.category, {})[row.year] = row.percentage
+    return {
+        'years': years,
+        'revenue': revenue,
+        'profit': profit,
+        'reportedGrowth': reported,
+        'shares': {category: [by_year.get(year) for year in years]
+                   for category, by_year in sorted(shares.items())},
+    }
+
+
+def compute(columns, window):
+    """Derive every series from the raw columns; values are JSON-ready lists."""
+    np = _numpy()
+    ops = _NumpyOps(np) if np is not None else _PythonOps()
+    years = columns['years']
+    consecutive = ops.consecutive(years)
+    revenue = ops.array(columns['revenue'])
+    profit = ops.array(columns['profit'])
+    margin = ops.percent(profit, revenue)
+
+    result = {
+        'years': list(years),
+        'revenue': ops.tolist(revenue),
+        'profit': ops.tolist(profit),
+        'reportedGrowth': ops.tolist(ops.array(columns['reportedGrowth'])),
+        'growth': ops.tolist(ops.growth(revenue, consecutive)),
+        'margin': ops.tolist(margin),
+        'revenueDelta': ops.tolist(ops.delta(revenue, consecutive)),
+        'profitDelta': ops.tolist(ops.delta(profit, consecutive)),
+        'marginDelta': ops.tolist(ops.delta(margin, consecutive)),
+        'revenueRolling': ops.tolist(ops.rolling(revenue, window)),
+        'profitRolling': ops.tolist(ops.rolling(profit, window)),
+        'marginRolling': ops.tolist(ops.rolling(margin, window)),
+        'segments': {},
+    }
+    for category, shares in columns['shares'].items():
+        share = ops.array(shares)
+        result['segments'][category] = {
+            'percentage': ops.tolist(share),
+            'revenue': ops.tolist(ops.scale(revenue, share)),
+        }
+    return result
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+class _NumpyOps:
+    def __init__(self, np):
+        self.np = np
+
+    def array(self, values):
+        return self.np.array([math.nan if value is None else value for value in values], dtype=float)
+
+    def consecutive(self, years):
+        # consecutive[i]: years[i - 1] is the year right before years[i]
+        years = self.np.asarray(years)
+        return self.np.concatenate(([False], self.np.diff(years) == 1)) if len(years) else years
+
+    def _previous(self, values, consecutive):
+        previous = self.np.full_like(values, math.nan)
+        previous[1:] = values[:-1]
+        previous[~consecutive] = math.nan
+        return previous
+
+    def delta(self, values, consecutive):
+        return values - self._previous(values, consecutive)
+
+    def growth(self, values, consecutive):
+        previous = self._previous(values, consecutive)
+        with self.np.errstate(divide='ignore', invalid='ignore'):
+            return (values - previous) / previous * 100
+
+    def percent(self, part, whole):
+        with self.np.errstate(divide='ignore', invalid='ignore'):
+            return part / whole * 100
+
+    def scale(self, values, percentages):
+        return values * percentages / 100
+
+    def rolling(self, values, window):
+        result = self.np.full_like(values, math.nan)
+        if len(values) >= window:
+            windows = self.np.lib.stride_tricks.sliding_window_view(values, window)
+            result[window - 1:] = windows.mean(axis=1)
+        return result
+
+    def tolist(self, values):
+        return [None if not math.isfinite(value) else round(value, 4) for value in values.tolist()]
+
+
+class _PythonOps:
+    """Plain-Python equivalents of :class:`_NumpyOps`; ``None`` plays NaN."""
+
+    def array(self, values):
+        return list(values)
+
+    def consecutive(self, years):
+        return [i > 0 and years[i] - years[i - 1] == 1 for i in range(len(years))]
+
+    def delta(self, values, consecutive):
+        return [_binary(values[i], values[i - 1], lambda a, b: a - b) if consecutive[i] else None
+                for i in range(len(values))]
+
+    def growth(self, values, consecutive):
+        return [_binary(values[i], values[i - 1], lambda a, b: (a - b) / b * 100) if consecutive[i] else None
+                for i in range(len(values))]
+
+    def percent(self, part, whole):
+        return [_binary(a, b, lambda a, b: a / b * 100) for a, b in zip(part, whole)]
+
+    def scale(self, values, percentages):
+        return [_binary(a, b, lambda a, b: a * b / 100) for a, b in zip(values, percentages)]
+
+    def rolling(self, values, window):
+        result = [None] * len(values)
+        for i in range(window - 1, len(values)):
+            chunk = values[i - window + 1:i + 1]
+            if None not in chunk:
+                result[i] = sum(chunk) / window
+        return result
+
+    def tolist(self, values):
+        return [None if value is None or not math.isfinite(value) else round(value, 4) for value in values]
+
+
+def _binary(a, b, op):
+    if a is None or b is None:
+        return None
+    try:
+        return op(a, b)
+    except ZeroDivisionError:
+        return None
+
+
+def _summary(years, revenue, profit):
+    summary = {'from': years[0] if years else None, 'to': years[-1] if years else None,
+               'revenueCagr': None, 'profitCagr': None}
+    if len(years) > 1:
+        span = years[-1] - years[0]
+        summary['revenueCagr'] = _cagr(revenue[0], revenue[-1], span)
+        summary['profitCagr'] = _cagr(profit[0], profit[-1], span)
+    return summary
+
+
+def _cagr(first, last, span):
+    if first is None or last is None or first <= 0 or last <= 0:
+        return None
+    return round(((last / first) ** (1 / span) - 1) * 100, 4)
+
+
+def _numpy():
+    # Imported on first use so startup does not pay for it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,83 @@
+"""Conditional GET (ETag / Last-Modified) for the polled JSON endpoints.
+
+A per-table version is derived from ``count(*)``, ``max(id)`` and the newest
+``updated_at``/``created_at`` in a single aggregate query, so a client that
+already holds the current payload gets a 304 before any rows are loaded or
+serialised.
+"""
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import g, make_response, request
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
+
+from app import db
+
+
+def version_select(*models):
+    """Build the aggregate SELECT behind :func:`table_versions`.
+
+    Returns the statement and the positions of its timestamp columns.
+    """
+    columns = []
+    timestamped = []
+    for model in models:
+        columns.append(db.select(func.count()).select_from(model).scalar_subquery())
+        columns.append(db.select(func.max(model.id)).scalar_subquery())
+        stamp = _timestamp_column(model)
+        if stamp is not None:
+            columns.append(db.select(func.max(stamp)).scalar_subquery())
+            timestamped.append(len(columns) - 1)
+    return db.select(*columns), timestamped
+
+
+def table_versions(*models):
+    """Return ``(etag_source, last_modified)`` for the given models' tables."""
+    stmt, timestamped = version_select(*models)
+    row = db.session.execute(stmt).one()
+    stamps = [row[i] for i in timestamped if row[i] is not None]
+    last_modified = max(stamps).replace(tzinfo=timezone.utc) if stamps else None
+    return '|'.join(str(value) for value in row), last_modified
+
+
+def conditional(*models, expand=None):
+    """Decorate a GET view so unchanged data is answered with 304 up front.
+
+    ``expand`` maps ``?expand=`` names to the models they embed, whose
+    tables then join the version when that expansion is requested.
+    """
+    expand = expand or {}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            requested = {name.strip() for name in request.args.get('expand', '').split(',')}
+            source, last_modified = table_versions(
+                *models, *(model for name, model in expand.items() if name in requested))
+            # Views that cache derived data can key it on the same version
+            g.table_versions = source
+            # The query string selects fields/pages, so it is part of the entity
+            digest = hashlib.blake2b(f'{request.full_path}|{source}'.encode(), digest_size=12)
+            etag = digest.hexdigest()
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _timestamp_column(model):
+    for name in ('updated_at', 'created_at'):
+        if name in model.__table__.columns:
+            return getattr(model, name)
+    return None
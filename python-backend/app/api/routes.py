@@ -1,39 +1,121 @@
-from flask import jsonify, request
+import json
+from flask import current_app, g, jsonify, request, send_file
 from flask_login import login_required, current_user
 from app.api import bp
-from app.models import User, Document, Announcement
-from app import db
+from app.api.conditional import conditional
+from app.api.pagination import PaginationError, keyset_response
+from app.models import (User, Document, Announcement, FinancialMetric,
+                        RevenueBreakdown, YearlyFinancial, InvestorEvent,
+                        ContentItem, ContentWorkflow, ContentHistory)
+from app import (db, analytics, bulk, cache, content, financials, nplusone, search, user_cache,
+                 document_store)
+from app.directory import directory
+from app.storage import UploadTooLarge
+
+# API field name -> column, used for ``fields=`` projection
+EMPLOYEE_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'fullName': User.full_name,
+    'email': User.email,
+    'department': User.department,
+    'title': User.title,
+    'role': User.role,
+}
+
+DOCUMENT_FIELDS = {
+    'id': Document.id,
+    'title': Document.title,
+    'description': Document.description,
+    'fileName': Document.file_name,
+    'mimeType': Document.mime_type,
+    'uploadedBy': Document.uploaded_by,
+    'contentHash': Document.content_hash,
+    'size': Document.size,
+    'createdAt': Document.created_at,
+}
+
+ANNOUNCEMENT_FIELDS = {
+    'id': Announcement.id,
+    'title': Announcement.title,
+    'content': Announcement.content,
+    'createdBy': Announcement.created_by,
+    'createdAt': Announcement.created_at,
+    'isImportant': Announcement.is_important,
+}
+
+CONTENT_FIELDS = {
+    'id': ContentItem.id,
+    'title': ContentItem.title,
+    'description': ContentItem.description,
+    'contentType': ContentItem.content_type,
+    'status': ContentItem.status,
+    'assignedTo': ContentItem.assigned_to,
+    'deadline': ContentItem.deadline,
+    'createdBy': ContentItem.created_by,
+    'createdAt': ContentItem.created_at,
+    'updatedAt': ContentItem.updated_at,
+}
+
+# Related records available through ``expand=author``
+AUTHOR_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'fullName': User.full_name,
+    'department': User.department,
+    'title': User.title,
+}
 
 def check_admin():
     return current_user.role == 'admin'
 
+@bp.errorhandler(PaginationError)
+@bp.errorhandler(content.WorkflowError)
+@bp.errorhandler(content.ContentValidationError)
+@bp.errorhandler(analytics.AnalyticsError)
+def bad_request_error(e):
+    return jsonify({'error': str(e)}), 400
+
 @bp.route('/api/employees')
 @login_required
+@cache.cached(User)
 def get_employees():
-    users = User.query.all()
-    return jsonify([{
-        'id': user.id,
-        'username': user.username,
-        'fullName': user.full_name,
-        'email': user.email,
-        'department': user.department,
-        'title': user.title,
-        'role': user.role
-    } for user in users])
+    return keyset_response(EMPLOYEE_FIELDS, (User.id,))
+
+@bp.route('/api/employees/search')
+@login_required
+def search_employees():
+    try:
+        limit = int(request.args.get('limit', current_app.config['DIRECTORY_SEARCH_LIMIT']))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= current_app.config['API_MAX_PAGE_SIZE']:
+        return jsonify({'error': f"limit must be between 1 and {current_app.config['API_MAX_PAGE_SIZE']}"}), 400
+    return jsonify(directory.search(request.args.get('q', '').strip(), limit,
+                                    request.args.get('department') or None,
+                                    request.args.get('role') or None))
+
+@bp.route('/api/employees/import', methods=['POST'])
+@login_required
+def import_employees():
+    if not check_admin():
+        return '', 403
+    records = _import_records()
+    if records is None:
+        return jsonify({'error': 'Send text/csv or application/x-ndjson'}), 415
+    report = bulk.import_users(records, current_app.config['BULK_IMPORT_HASH_METHOD'])
+    if report.created:
+        # Bulk inserts skip the ORM events that keep the index current
+        directory.invalidate()
+    return jsonify(report.to_dict())
 
 @bp.route('/api/documents')
 @login_required
+@conditional(Document, expand={'author': User})
+@cache.cached(Document, User)
 def get_documents():
-    documents = Document.query.all()
-    return jsonify([{
-        'id': doc.id,
-        'title': doc.title,
-        'description': doc.description,
-        'fileName': doc.file_name,
-        'mimeType': doc.mime_type,
-        'uploadedBy': doc.uploaded_by,
-        'createdAt': doc.created_at.isoformat()
-    } for doc in documents])
+    return keyset_response(DOCUMENT_FIELDS, (Document.created_at, Document.id),
+                           expand={'author': (Document.author, AUTHOR_FIELDS)})
 
 @bp.route('/api/documents', methods=['POST'])
 @login_required
@@ -58,91 +140,189 @@ def create_document():
         'createdAt': doc.created_at.isoformat()
     }), 201
 
+@bp.route('/api/documents/import', methods=['POST'])
+@login_required
+def import_documents():
+    if not check_admin():
+        return '', 403
+    records = _import_records()
+    if records is None:
+        return jsonify({'error': 'Send text/csv or application/x-ndjson'}), 415
+    report = bulk.import_documents(records, uploaded_by=current_user.id)
+    return jsonify(report.to_dict())
+
+def _import_records():
+    # Imports run the same batched INSERT/lookup per chunk by design
+    nplusone.exempt()
+    fmt = request.args.get('format') or bulk.detect_format(request.mimetype)
+    if fmt not in bulk.FORMATS:
+        return None
+    return bulk.read_records(request.stream, fmt)
+
 @bp.route('/api/documents/<int:id>', methods=['DELETE'])
 @login_required
 def delete_document(id):
     if not check_admin():
         return '', 403
     doc = Document.query.get_or_404(id)
+    # The blob may be shared; `flask documents-gc` removes it once unreferenced
     db.session.delete(doc)
     db.session.commit()
     return '', 204
 
+@bp.route('/api/documents/<int:id>/content', methods=['PUT'])
+@login_required
+def upload_document_content(id):
+    doc = db.get_or_404(Document, id)
+    if not check_admin() and doc.uploaded_by != current_user.id:
+        return '', 403
+    max_size = current_app.config['DOCUMENT_MAX_SIZE']
+    if request.content_length is not None and request.content_length > max_size:
+        return jsonify({'error': f'Documents are limited to {max_size} bytes'}), 413
+    # Read the raw body stream; touching request.data or request.form would buffer it
+    try:
+        digest, size = document_store.save(request.stream, max_size)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    doc.content_hash = digest
+    doc.size = size
+    db.session.commit()
+    return jsonify({'id': doc.id, 'contentHash': digest, 'size': size})
+
+@bp.route('/api/documents/<int:id>/content')
+@login_required
+def download_document_content(id):
+    doc = db.get_or_404(Document, id)
+    if doc.content_hash is None or not document_store.exists(doc.content_hash):
+        return jsonify({'error': 'No content has been uploaded for this document'}), 404
+    # conditional=True answers If-None-Match/If-Modified-Since and Range requests
+    response = send_file(
+        document_store.path(doc.content_hash),
+        mimetype=doc.mime_type,
+        as_attachment=request.args.get('download', '').lower() in ('1', 'true'),
+        download_name=doc.file_name,
+        conditional=True,
+        etag=doc.content_hash,
+        last_modified=doc.updated_at or doc.created_at,
+    )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 @bp.route('/api/announcements')
 @login_required
+@conditional(Announcement, expand={'author': User})
+@cache.cached(Announcement, User)
 def get_announcements():
-    announcements = Announcement.query.all()
-    return jsonify([{
-        'id': ann.id,
-        'title': ann.title,
-        'content': ann.content,
-        'createdBy': ann.created_by,
+    return keyset_response(ANNOUNCEMENT_FIELDS, (Announcement.created_at, Announcement.id),
+                           expand={'author': (Announcement.author, AUTHOR_FIELDS)})
 
-@bp.route('/api/financials/metrics')
-def get_financial_metrics():
-    """Get financial metrics data"""
+@bp.route('/api/announcements', methods=['POST'])
+@login_required
+def create_announcement():
+    if not check_admin():
+        return '', 403
+    data = request.get_json()
+    announcement = Announcement(
+        title=data['title'],
+        content=data['content'],
+        created_by=current_user.id,
+        is_important=data.get('isImportant', False)
+    )
+    db.session.add(announcement)
+    db.session.commit()
+    return jsonify({
+        'id': announcement.id,
+        'title': announcement.title,
+        'content': announcement.content,
+        'createdBy': announcement.created_by,
+        'createdAt': announcement.created_at.isoformat(),
+        'isImportant': announcement.is_important
+    }), 201
+
+@bp.route('/api/announcements/<int:id>', methods=['DELETE'])
+@login_required
+def delete_announcement(id):
+    if not check_admin():
+        return '', 403
+    announcement = Announcement.query.get_or_404(id)
+    db.session.delete(announcement)
+    db.session.commit()
+    return '', 204
+
+@bp.route('/api/search')
+@login_required
+def search_content():
+    query = request.args.get('q', '')
+    types = request.args.get('type')
+    types = set(types.split(',')) if types else None
     try:
-        # Add your financial metrics logic here
-        metrics = {
-            "totalRevenue": 0,
-            "totalExpenses": 0,
-            "profit": 0,
-            "profitMargin": 0
-        }
-        return jsonify(metrics)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        limit = min(int(request.args.get('limit', 20)), current_app.config['API_MAX_PAGE_SIZE'])
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset non-negative'}), 400
+
+    # One extra hit tells us whether there is a next page
+    hits = search.search(query, types, limit + 1, offset)
+    response = jsonify(hits[:limit])
+    if len(hits) > limit:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return response
+
+@bp.route('/api/financials/metrics')
 @login_required
+@conditional(FinancialMetric)
 def get_financial_metrics():
-    metrics = FinancialMetric.query.order_by(FinancialMetric.display_order).all()
-    return jsonify([{
-        'id': metric.id,
-        'name': metric.name,
-        'value': metric.value,
-        'description': metric.description,
-        'icon': metric.icon,
-        'displayOrder': metric.display_order,
-        'createdAt': metric.created_at.isoformat() if metric.created_at else None,
-    } for metric in metrics])
+    return _snapshot_response('metrics')
 
 @bp.route('/api/financials/revenue-breakdown')
 @login_required
+@conditional(RevenueBreakdown)
 def get_revenue_breakdown():
-    breakdown = RevenueBreakdown.query.order_by(RevenueBreakdown.display_order).all()
-    return jsonify([{
-        'id': item.id,
-        'category': item.category,
-        'percentage': item.percentage,
-        'colorClass': item.color_class,
-        'displayOrder': item.display_order,
-        'year': item.year,
-        'createdAt': item.created_at.isoformat() if item.created_at else None,
-    } for item in breakdown])
+    try:
+        if request.args.get('year'):
+            start = end = int(request.args['year'])
+        else:
+            start = int(request.args['from']) if request.args.get('from') else None
+            end = int(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'year, from and to must be integers'}), 400
+    if request.args.get('pivot', '').lower() in ('1', 'true'):
+        return jsonify(financials.revenue_pivot(start, end))
+    return current_app.response_class(financials.get_snapshot().breakdown_payload(start, end),
+                                      mimetype='application/json')
 
 @bp.route('/api/financials/yearly')
 @login_required
+@conditional(YearlyFinancial)
 def get_yearly_financials():
-    yearly = YearlyFinancial.query.order_by(YearlyFinancial.year.desc()).all()
-    return jsonify([{
-        'id': item.id,
-        'year': item.year,
-        'revenue': item.revenue,
-        'growthPercentage': item.growth_percentage,
-        'profit': item.profit,
-        'createdAt': item.created_at.isoformat() if item.created_at else None,
-    } for item in yearly])
+    return _snapshot_response('yearly')
 
 @bp.route('/api/financials/investor-events')
 @login_required
+@conditional(InvestorEvent)
 def get_investor_events():
-    events = InvestorEvent.query.order_by(InvestorEvent.event_date).all()
-    return jsonify([{
-        'id': event.id,
-        'title': event.title,
-        'description': event.description,
-        'eventDate': event.event_date.isoformat() if event.event_date else None,
-        'createdAt': event.created_at.isoformat() if event.created_at else None,
-    } for event in events])
+    return _snapshot_response('investor_events')
+
+@bp.route('/api/financials/analytics')
+@login_required
+@conditional(YearlyFinancial, RevenueBreakdown)
+def get_financial_analytics():
+    try:
+        start = int(request.args['from']) if request.args.get('from') else None
+        end = int(request.args['to']) if request.args.get('to') else None
+        window = int(request.args.get('window', 3))
+    except ValueError:
+        return jsonify({'error': 'from, to and window must be integers'}), 400
+    series = analytics.parse_series(request.args.get('metrics'))
+    return jsonify(analytics.report(g.table_versions, series, start, end, window))
+
+def _snapshot_response(name):
+    return current_app.response_class(financials.get_snapshot().payloads[name],
+                                      mimetype='application/json')
 
 @bp.route('/api/financials/metrics', methods=['POST'])
 @login_required
@@ -160,6 +340,7 @@ def create_financial_metric():
     )
     db.session.add(metric)
     db.session.commit()
+    financials.invalidate()
     
     return jsonify({
         'id': metric.id,
@@ -171,39 +352,152 @@ def create_financial_metric():
         'createdAt': metric.created_at.isoformat() if metric.created_at else None,
     }), 201
 
-        'createdAt': ann.created_at.isoformat(),
-        'isImportant': ann.is_important
-    } for ann in announcements])
-
-@bp.route('/api/announcements', methods=['POST'])
+@bp.route('/api/admin/cache-stats')
 @login_required
-def create_announcement():
+def get_cache_stats():
     if not check_admin():
         return '', 403
+    return jsonify({'userLoader': user_cache.stats(), 'financialAnalytics': analytics.cache_stats(),
+                    'employeeSearch': directory.results.stats(), 'queryCache': cache.stats()})
+
+@bp.route('/api/content')
+@login_required
+@cache.cached(ContentItem)
+def get_content_items():
+    content_type = request.args.get('contentType') or request.args.get('type')
+    where = [ContentItem.content_type == content_type] if content_type else []
+    if request.args.get('status'):
+        where.append(ContentItem.status == request.args['status'])
+    return keyset_response(CONTENT_FIELDS, (ContentItem.created_at, ContentItem.id), where=where)
+
+@bp.route('/api/content/board')
+@login_required
+def get_content_board():
+    try:
+        limit = int(request.args.get('limit', current_app.config['CONTENT_BOARD_LIMIT']))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, current_app.config['API_MAX_PAGE_SIZE'])
+    content_type = request.args.get('contentType') or request.args.get('type')
+    return jsonify(content.board(limit, content_type))
+
+@bp.route('/api/content/<int:id>')
+@login_required
+def get_content_item(id):
+    item = db.get_or_404(ContentItem, id)
+    history = db.session.execute(
+        db.select(ContentHistory).where(ContentHistory.content_id == id)
+        .order_by(ContentHistory.created_at, ContentHistory.id)).scalars()
+    data = content.item_json(item)
+    data['history'] = [content.history_json(entry) for entry in history]
+    return jsonify(data)
+
+@bp.route('/api/content', methods=['POST'])
+@login_required
+def create_content_item():
     data = request.get_json()
-    announcement = Announcement(
+    if not data or not data.get('title') or not data.get('contentType'):
+        return jsonify({'error': 'title and contentType are required'}), 400
+    workflow = content.workflow_for(data['contentType'])
+    status = data.get('status') or workflow.initial
+    workflow.check_initial(status)
+    item = ContentItem(
         title=data['title'],
-        content=data['content'],
-        created_by=current_user.id,
-        is_important=data.get('isImportant', False)
+        description=data.get('description'),
+        content_type=data['contentType'],
+        status=status,
+        assigned_to=data.get('assignedTo'),
+        deadline=content.parse_deadline(data.get('deadline')),
+        created_by=current_user.id
     )
-    db.session.add(announcement)
+    db.session.add(item)
+    db.session.flush()
+    content.record_history(item, status, current_user.id, data.get('notes'))
     db.session.commit()
-    return jsonify({
-        'id': announcement.id,
-        'title': announcement.title,
-        'content': announcement.content,
-        'createdBy': announcement.created_by,
-        'createdAt': announcement.created_at.isoformat(),
-        'isImportant': announcement.is_important
-    }), 201
+    return jsonify(content.item_json(item)), 201
 
-@bp.route('/api/announcements/<int:id>', methods=['DELETE'])
+@bp.route('/api/content/<int:id>', methods=['PUT'])
 @login_required
-def delete_announcement(id):
-    if not check_admin():
+def update_content_item(id):
+    item = db.get_or_404(ContentItem, id)
+    if not check_admin() and item.created_by != current_user.id:
         return '', 403
-    announcement = Announcement.query.get_or_404(id)
-    db.session.delete(announcement)
+    data = request.get_json() or {}
+    for key, attr in (('title', 'title'), ('description', 'description'),
+                      ('assignedTo', 'assigned_to')):
+        if key in data:
+            setattr(item, attr, data[key])
+    if 'deadline' in data:
+        item.deadline = content.parse_deadline(data['deadline'])
+    if 'contentType' in data and data['contentType'] != item.content_type:
+        # Keep the item's step if the new workflow has it, else start over;
+        # a requested status is then checked from there like any other move
+        workflow = content.workflow_for(data['contentType'])
+        item.content_type = data['contentType']
+        if item.status not in workflow.steps:
+            item.status = workflow.initial
+            content.record_history(item, item.status, current_user.id,
+                                   f"Moved to the '{item.content_type}' workflow")
+
+    status = data.get('status')
+    if status and status != item.status:
+        content.workflow_for(item.content_type).check_transition(item.status, status)
+        item.status = status
+        content.record_history(item, status, current_user.id, data.get('notes'))
+    db.session.commit()
+    return jsonify(content.item_json(item))
+
+@bp.route('/api/content/<int:id>', methods=['DELETE'])
+@login_required
+def delete_content_item(id):
+    item = db.get_or_404(ContentItem, id)
+    if not check_admin() and item.created_by != current_user.id:
+        return '', 403
+    db.session.execute(db.delete(ContentHistory).where(ContentHistory.content_id == id))
+    db.session.delete(item)
     db.session.commit()
     return '', 204
+
+@bp.route('/api/workflows')
+@login_required
+def get_workflows():
+    return jsonify([content.workflow_json(workflow) for workflow in content.all_workflows()])
+
+@bp.route('/api/workflows', methods=['POST'])
+@login_required
+def create_workflow():
+    if not check_admin():
+        return '', 403
+    data = request.get_json()
+    if not data or not data.get('name') or not data.get('contentType'):
+        return jsonify({'error': 'name and contentType are required'}), 400
+    steps = content.parse_steps(data.get('steps'))
+    if content.type_taken(data['contentType']):
+        return jsonify({'error': f"A workflow for '{data['contentType']}' already exists"}), 409
+    workflow = ContentWorkflow(name=data['name'], content_type=data['contentType'],
+                               steps=json.dumps(list(steps)))
+    db.session.add(workflow)
+    db.session.commit()
+    content.invalidate()
+    return jsonify(content.workflow_json(content.Workflow.from_row(workflow))), 201
+
+@bp.route('/api/workflows/<int:id>', methods=['PUT'])
+@login_required
+def update_workflow(id):
+    if not check_admin():
+        return '', 403
+    workflow = db.get_or_404(ContentWorkflow, id)
+    data = request.get_json() or {}
+    if 'name' in data:
+        workflow.name = data['name']
+    if 'contentType' in data:
+        if content.type_taken(data['contentType'], exclude_id=workflow.id):
+            return jsonify({'error': f"A workflow for '{data['contentType']}' already exists"}), 409
+        workflow.content_type = data['contentType']
+    if 'steps' in data:
+        workflow.steps = json.dumps(list(content.parse_steps(data['steps'])))
+    db.session.commit()
+    content.invalidate()
+    return jsonify(content.workflow_json(content.Workflow.from_row(workflow)))
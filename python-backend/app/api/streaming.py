@@ -0,0 +1,54 @@
+"""Incremental JSON array responses for large collections.
+
+Rows are read in chunks with ``yield_per`` (a server-side cursor on
+PostgreSQL) and written out as they arrive, so memory and time to first
+byte do not grow with the size of the table.
+"""
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import func
+
+from app import db
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+
+def should_stream(stmt):
+    """Decide whether ``stmt`` should be streamed for the current request.
+
+    ``?stream=1``/``?stream=0`` force the mode; otherwise streaming kicks in
+    once the result has more than ``API_STREAM_THRESHOLD`` rows.  The
+    threshold check counts at most ``threshold + 1`` rows, so it stays cheap
+    on big tables.
+    """
+    requested = request.args.get('stream', '').lower()
+    if requested in TRUE_VALUES:
+        return True
+    if requested in FALSE_VALUES:
+        return False
+
+    threshold = current_app.config['API_STREAM_THRESHOLD']
+    probe = (stmt.with_only_columns(db.literal(1), maintain_column_froms=True)
+             .order_by(None).limit(threshold + 1))
+    count = db.session.scalar(db.select(func.count()).select_from(probe.subquery()))
+    return count > threshold
+
+
+def stream_response(stmt, serialize):
+    return Response(stream_with_context(_generate(stmt, serialize)),
+                    mimetype='application/json')
+
+
+def _generate(stmt, serialize):
+    chunk_size = current_app.config['API_STREAM_CHUNK_SIZE']
+    dumps = current_app.json.dumps
+    result = db.session.execute(stmt, execution_options={'yield_per': chunk_size})
+    try:
+        yield '['
+        separator = ''
+        for partition in result.partitions():
+            yield separator + ','.join(dumps(serialize(row)) for row in partition)
+            separator = ','
+        yield ']'
+    finally:
+        result.close()
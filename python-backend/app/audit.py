@@ -0,0 +1,195 @@
+"""Query-plan audit for the statements the blueprints issue.
+
+``flask db-audit`` seeds synthetic rows inside a transaction, runs
+``EXPLAIN QUERY PLAN`` (SQLite) or ``EXPLAIN ANALYZE`` (PostgreSQL) for each
+query shape below and flags full table scans and explicit sorts.  The
+transaction is rolled back afterwards and no DDL is run, so the database is
+left untouched.  The search query is only audited once the search index
+exists (``flask db upgrade`` or ``flask search-reindex``).
+"""
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import content, db, financials, search
+from app.api.conditional import version_select
+from app.api.pagination import keyset_select
+from app.models import (User, Document, Announcement, FinancialMetric, RevenueBreakdown,
+                        YearlyFinancial, InvestorEvent, ContentItem, ContentHistory)
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    if compiler.dialect.name == 'postgresql':
+        prefix = 'EXPLAIN ANALYZE '
+    else:
+        prefix = 'EXPLAIN QUERY PLAN '
+    sql = prefix + compiler.process(element.statement, **kw)
+    # Plan rows don't have the wrapped statement's columns, so drop its result map
+    compiler._result_columns = []
+    return sql
+
+
+def audit_queries():
+    """Return ``(name, statement, params)`` for each query shape the routes run."""
+    from app.api.routes import (EMPLOYEE_FIELDS, DOCUMENT_FIELDS, ANNOUNCEMENT_FIELDS,
+                                CONTENT_FIELDS, AUTHOR_FIELDS)
+
+    epoch = datetime(2000, 1, 1)
+    queries = [
+        ('load_user', db.select(User).where(User.id == 1), None),
+        ('login', db.select(User).where(User.username == 'audit-user-1').limit(1), None),
+        ('bulk.username_lookup', db.select(User.username).where(User.username.in_(['a', 'b'])), None),
+    ]
+    for name, fields, key in (
+            ('employees', EMPLOYEE_FIELDS, (User.id,)),
+            ('documents', DOCUMENT_FIELDS, (Document.created_at, Document.id)),
+            ('announcements', ANNOUNCEMENT_FIELDS, (Announcement.created_at, Announcement.id)),
+            ('content', CONTENT_FIELDS, (ContentItem.created_at, ContentItem.id))):
+        first = keyset_select(fields, key, list(fields), limit=100)
+        after = [epoch, 0] if len(key) == 2 else [0]
+        queries.append((f'{name}.first_page', first, None))
+        queries.append((f'{name}.next_page', keyset_select(fields, key, list(fields), after, 100), None))
+
+    # ?expand=author joins the author's columns into the same page query
+    for name, model, fields in (('documents', Document, DOCUMENT_FIELDS),
+                                ('announcements', Announcement, ANNOUNCEMENT_FIELDS)):
+        key = (model.created_at, model.id)
+        expands = [('author', model.author, AUTHOR_FIELDS)]
+        queries.append((f'{name}.expand_author',
+                        keyset_select(fields, key, list(fields), limit=100, expands=expands), None))
+
+    content_key = (ContentItem.created_at, ContentItem.id)
+    queries += [
+        ('content.filtered_page',
+         keyset_select(CONTENT_FIELDS, content_key, list(CONTENT_FIELDS), limit=100,
+                       where=[ContentItem.content_type == 'blog', ContentItem.status == 'review']), None),
+        ('content.board', content.board_query(5), None),
+        ('content.board_by_type', content.board_query(5, 'blog'), None),
+    ]
+
+    for name, model in (('documents', Document), ('announcements', Announcement),
+                        ('content', ContentItem), ('users', User),
+                        ('financials.metrics', FinancialMetric),
+                        ('financials.revenue_breakdown', RevenueBreakdown),
+                        ('financials.yearly', YearlyFinancial),
+                        ('financials.investor_events', InvestorEvent)):
+        queries.append((f'{name}.version', version_select(model)[0], None))
+
+    queries += [
+        ('financials.metrics', db.select(FinancialMetric).order_by(FinancialMetric.display_order), None),
+        ('financials.revenue_breakdown',
+         db.select(RevenueBreakdown).order_by(RevenueBreakdown.year, RevenueBreakdown.display_order), None),
+        ('financials.revenue_pivot', financials.pivot_select(2010, 2020), None),
+        ('financials.yearly', db.select(YearlyFinancial).order_by(YearlyFinancial.year.desc()), None),
+        ('financials.investor_events', db.select(InvestorEvent).order_by(InvestorEvent.event_date), None),
+        ('financials.upcoming_events',
+         db.select(InvestorEvent).where(InvestorEvent.event_date >= date.today())
+         .order_by(InvestorEvent.event_date).limit(3), None),
+        ('documents.by_uploader', db.select(Document.id).where(Document.uploaded_by == 1), None),
+        ('announcements.by_author', db.select(Announcement.id).where(Announcement.created_by == 1), None),
+        ('content.by_status', db.select(ContentItem).where(ContentItem.status == 'review'), None),
+        ('content.by_assignee', db.select(ContentItem).where(ContentItem.assigned_to == 1), None),
+        ('content.history', db.select(ContentHistory).where(ContentHistory.content_id == 1), None),
+    ]
+
+    # The audit never creates the index, so skip the shape until it exists
+    if search.index_exists():
+        if db.engine.dialect.name == 'postgresql':
+            queries.append(('search', text(search._postgres_query(list(search.SOURCES))),
+                            {'q': 'audit', 'limit': 20, 'offset': 0}))
+        else:
+            queries.append(('search', text(search._sqlite_query(list(search.SOURCES))),
+                            {'q': '"audit"*', 'limit': 20, 'offset': 0}))
+    return queries
+
+
+def seed(rows):
+    """Insert ``rows`` synthetic rows per table into the current transaction."""
+    now = datetime.utcnow()
+    users = [{'username': f'audit-user-{i}', 'password_hash': '', 'full_name': f'Audit User {i}',
+              'email': f'audit{i}@example.com', 'department': f'Dept {i % 20}',
+              'title': 'Auditor', 'role': 'employee'} for i in range(rows)]
+    db.session.execute(db.insert(User), users)
+    user_id = db.session.scalar(db.select(db.func.min(User.id)).where(User.username.like('audit-user-%')))
+
+    def stamp(i):
+        return now - timedelta(minutes=i)
+
+    db.session.execute(db.insert(Document), [
+        {'title': f'Audit document {i}', 'description': 'audit', 'file_name': f'doc{i}.pdf',
+         'mime_type': 'application/pdf', 'uploaded_by': user_id + i % rows, 'created_at': stamp(i)}
+        for i in range(rows)])
+    db.session.execute(db.insert(Announcement), [
+        {'title': f'Audit announcement {i}', 'content': 'audit', 'created_by': user_id,
+         'created_at': stamp(i), 'is_important': i % 10 == 0} for i in range(rows)])
+    db.session.execute(db.insert(FinancialMetric), [
+        {'name': f'Metric {i}', 'value': float(i), 'display_order': i} for i in range(rows)])
+    db.session.execute(db.insert(RevenueBreakdown), [
+        {'category': f'Category {i}', 'percentage': 1.0, 'display_order': i, 'year': 2000 + i % 30}
+        for i in range(rows)])
+    db.session.execute(db.insert(YearlyFinancial), [
+        {'year': 1000 + i, 'revenue': float(i), 'profit': float(i)} for i in range(rows)])
+    db.session.execute(db.insert(InvestorEvent), [
+        {'title': f'Event {i}', 'event_date': date.today() + timedelta(days=i - rows // 2)}
+        for i in range(rows)])
+    db.session.execute(db.insert(ContentItem), [
+        {'title': f'Content {i}', 'content_type': 'blog', 'status': ('draft', 'review', 'published')[i % 3],
+         'assigned_to': user_id + i % rows, 'created_by': user_id} for i in range(rows)])
+    content_id = db.session.scalar(db.select(db.func.min(ContentItem.id)).where(ContentItem.title.like('Content %')))
+    db.session.execute(db.insert(ContentHistory), [
+        {'content_id': content_id + i % rows, 'status': 'draft', 'created_by': user_id}
+        for i in range(rows)])
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('ANALYZE'))
+
+
+def explain(statement, params=None):
+    """Return the plan as a list of text lines."""
+    rows = db.session.execute(Explain(statement), params or {}).all()
+    if db.engine.dialect.name == 'postgresql':
+        return [row[0] for row in rows]
+    return [row[-1] for row in rows]
+
+
+def problems(plan):
+    """Describe the full scans and sorts found in ``plan``."""
+    found = []
+    for line in plan:
+        detail = line.strip()
+        match = SQLITE_SCAN.match(detail)
+        if match:
+            found.append(f'full scan of {match.group(1)}')
+        elif detail.startswith('USE TEMP B-TREE'):
+            found.append('sort (' + detail[len('USE TEMP B-TREE FOR '):].lower() + ')')
+        elif 'Seq Scan on' in detail:
+            found.append('full scan of ' + detail.split('Seq Scan on ', 1)[1].split()[0])
+        elif detail.lstrip('-> ').startswith('Sort '):
+            found.append('sort')
+    return found
+
+
+def run(rows):
+    """Seed, explain every query and roll back; returns ``[(name, plan, problems)]``."""
+    results = []
+    try:
+        if rows:
+            seed(rows)
+        for name, statement, params in audit_queries():
+            plan = explain(statement, params)
+            results.append((name, plan, problems(plan)))
+    finally:
+        db.session.rollback()
+    return results
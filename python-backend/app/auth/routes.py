@@ -42,6 +42,11 @@ def login():
     if user is None or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid username or password'}), 401
     
+    # Upgrade hashes made with an older method or cost while we have the password
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
     login_user(user)
     return jsonify({
         'id': user.id,
@@ -0,0 +1,178 @@
+"""Bulk ingestion of users and documents from CSV or NDJSON.
+
+Records use the same camelCase field names as the JSON API.  Each import
+runs in one transaction: rows are validated in batches, username and
+uploader checks are set-based ``IN`` queries, passwords are hashed in
+parallel and valid rows are written with a single executemany per batch.
+Invalid rows are skipped and reported back by their 1-based row number.
+"""
+import csv
+import io
+import json
+
+from app import db, hasher
+from app.models import User, Document
+
+FORMATS = ('csv', 'ndjson')
+BATCH_SIZE = 2000
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 900
+
+USER_FIELDS = ('username', 'password', 'fullName', 'email', 'department', 'title')
+DOCUMENT_FIELDS = ('title', 'fileName', 'mimeType')
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def error(self, row, message):
+        self.errors.append({'row': row, 'error': message})
+
+    def to_dict(self):
+        errors = sorted(self.errors, key=lambda error: error['row'])
+        return {'created': self.created, 'failed': len(errors), 'errors': errors}
+
+
+def detect_format(mimetype, filename=None):
+    if mimetype in ('text/csv', 'application/csv') or (filename or '').endswith('.csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-seq') \
+            or (filename or '').endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def read_records(stream, fmt):
+    """Yield ``(row_number, record_or_error)`` pairs from a binary stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, record
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(record, dict):
+            yield number, ValueError('Each line must be a JSON object')
+            continue
+        yield number, record
+
+
+def import_users(records, hash_method=None):
+    report = ImportReport()
+    seen = set()
+    for batch in _batches(records, report):
+        valid = []
+        for number, record in batch:
+            message = _missing(record, USER_FIELDS)
+            if message:
+                report.error(number, message)
+            elif record['username'] in seen:
+                report.error(number, 'Duplicate username in import')
+            else:
+                seen.add(record['username'])
+                valid.append((number, record))
+
+        taken = _existing(User.username, [record['username'] for _, record in valid])
+        rows = []
+        for number, record in valid:
+            if record['username'] in taken:
+                report.error(number, 'Username already exists')
+            else:
+                rows.append(record)
+
+        hashes = hasher.hash_many([record['password'] for record in rows], hash_method)
+        _insert(User, [{
+            'username': record['username'],
+            'password_hash': password_hash,
+            'full_name': record['fullName'],
+            'email': record['email'],
+            'department': record['department'],
+            'title': record['title'],
+            'role': record.get('role') or 'employee',
+        } for record, password_hash in zip(rows, hashes)])
+        report.created += len(rows)
+
+    db.session.commit()
+    return report
+
+
+def import_documents(records, uploaded_by):
+    report = ImportReport()
+    for batch in _batches(records, report):
+        valid = []
+        for number, record in batch:
+            message = _missing(record, DOCUMENT_FIELDS)
+            if message:
+                report.error(number, message)
+                continue
+            try:
+                uploader = int(record.get('uploadedBy') or uploaded_by)
+            except (TypeError, ValueError):
+                report.error(number, 'uploadedBy must be a user id')
+                continue
+            valid.append((number, record, uploader))
+
+        known = _existing(User.id, {uploader for _, _, uploader in valid})
+        rows = []
+        for number, record, uploader in valid:
+            if uploader not in known:
+                report.error(number, f'Unknown uploader {uploader}')
+                continue
+            rows.append({
+                'title': record['title'],
+                'description': record.get('description') or None,
+                'file_name': record['fileName'],
+                'mime_type': record['mimeType'],
+                'uploaded_by': uploader,
+            })
+
+        _insert(Document, rows)
+        report.created += len(rows)
+
+    db.session.commit()
+    return report
+
+
+def _batches(records, report):
+    """Group records into lists, reporting parse errors as they go by."""
+    batch = []
+    for number, record in records:
+        if isinstance(record, Exception):
+            report.error(number, str(record))
+            continue
+        batch.append((number, record))
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _missing(record, fields):
+    missing = [field for field in fields if not record.get(field)]
+    if missing:
+        return f"Missing field(s): {', '.join(missing)}"
+    return None
+
+
+def _existing(column, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        found.update(db.session.scalars(db.select(column).where(column.in_(chunk))))
+    return found
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(db.insert(model), rows)
@@ -0,0 +1,102 @@
+"""Flask CLI commands (``flask <command>``)."""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import bulk, db, document_store, search
+from app.models import Document
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS),
+              help='Input format; guessed from the file extension by default.')
+@with_appcontext
+def import_users_command(path, fmt):
+    """Bulk import users from a CSV or NDJSON file."""
+    fmt = fmt or bulk.detect_format(None, path)
+    if fmt is None:
+        raise click.UsageError('Cannot guess the format, pass --format')
+    with open(path, 'rb') as stream:
+        report = bulk.import_users(bulk.read_records(stream, fmt),
+                                   current_app.config['BULK_IMPORT_HASH_METHOD'])
+    _print_report(report)
+
+
+@click.command('import-documents')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--uploaded-by', type=int,
+              help='User id for rows without an uploadedBy value.')
+@with_appcontext
+def import_documents_command(path, fmt, uploaded_by):
+    """Bulk import document records from a CSV or NDJSON file."""
+    fmt = fmt or bulk.detect_format(None, path)
+    if fmt is None:
+        raise click.UsageError('Cannot guess the format, pass --format')
+    with open(path, 'rb') as stream:
+        report = bulk.import_documents(bulk.read_records(stream, fmt), uploaded_by)
+    _print_report(report)
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex_command():
+    """Create the full-text search index and rebuild it from the tables."""
+    search.ensure_index(rebuild=True)
+    click.echo('Search index rebuilt.')
+
+
+@click.command('documents-gc')
+@click.option('--grace', type=int,
+              help='Keep unreferenced blobs younger than this many seconds '
+                   '(default DOCUMENT_GC_GRACE).')
+@with_appcontext
+def documents_gc_command(grace):
+    """Delete stored document bodies that no document references."""
+    if grace is None:
+        grace = current_app.config['DOCUMENT_GC_GRACE']
+    referenced = set(db.session.scalars(
+        db.select(Document.content_hash).where(Document.content_hash.is_not(None)).distinct()))
+    removed = document_store.sweep(referenced, grace)
+    click.echo(f'Removed {removed} unreferenced file(s).')
+
+
+@click.command('db-audit')
+@click.option('--seed', 'rows', default=1000, show_default=True,
+              help='Synthetic rows per table, rolled back afterwards.')
+@click.option('--verbose', '-v', is_flag=True, help='Print every plan, not just flagged ones.')
+@click.option('--strict', is_flag=True, help='Exit with status 1 if anything is flagged.')
+@with_appcontext
+def db_audit_command(rows, verbose, strict):
+    """EXPLAIN every blueprint query and flag full scans and sorts."""
+    from app import audit
+
+    flagged = 0
+    for name, plan, problems in audit.run(rows):
+        if problems:
+            flagged += 1
+            click.secho(f"FLAG {name}: {'; '.join(problems)}", fg='yellow')
+        else:
+            click.echo(f'ok   {name}')
+        if problems or verbose:
+            for line in plan:
+                click.echo(f'       {line}')
+    click.echo(f'{flagged} flagged query shape(s).')
+    if strict and flagged:
+        raise SystemExit(1)
+
+
+def _print_report(report):
+    for error in report.errors:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f'Imported {report.created} row(s), {len(report.errors)} failed.')
+
+
+def register_commands(app):
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(import_documents_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(documents_gc_command)
+    app.cli.add_command(db_audit_command)
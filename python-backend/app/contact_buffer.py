@@ -0,0 +1,247 @@
+"""Write-behind buffer for contact form submissions.
+
+With ``CONTACT_BUFFER_ENABLED`` submissions are queued in memory and a
+background thread writes them with one multi-row INSERT and one commit
+every ``CONTACT_BUFFER_FLUSH_MS`` or ``CONTACT_BUFFER_MAX_ROWS`` rows,
+whichever comes first, so a burst costs a handful of fsyncs instead of one
+per message.  Otherwise each submission is committed immediately as before,
+with no deduplication.
+
+In buffered mode, repeats of the same email, subject and message within
+``CONTACT_DEDUP_WINDOW`` seconds are dropped (per process).  A submission
+only counts as seen once it is queued, so a rejected one can be retried.
+
+Queued rows are flushed when the process exits normally (gunicorn workers
+do, on SIGTERM and on ``max_requests`` restarts).  A batch that cannot be
+written is saved to an NDJSON spool under the instance folder and
+replayed once the database accepts writes again, so submissions are only
+lost if the process is killed outright with rows still queued.
+"""
+import atexit
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from app import db
+from app.models import ContactForm
+
+class ContactBuffer:
+    def __init__(self):
+        self._app = None
+        self.enabled = False
+        self.spool_dir = None
+        self._cond = threading.Condition()
+        self._rows = []
+        self._oldest = None
+        self._seen = {}  # fingerprint -> expiry; insertion order is expiry order
+        self._pid = None
+        self._stopping = False
+        self._flushing = False
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_seconds = 0.0
+        self.last_flush_rows = 0
+        self.last_flush_seconds = 0.0
+        self.duplicates = 0
+        self.spooled = 0
+        self.replayed = 0
+        self._spool_pending = False
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config['CONTACT_BUFFER_ENABLED']
+        self.spool_dir = os.path.join(app.instance_path, app.config['CONTACT_SPOOL_PATH'])
+        if self.enabled:
+            atexit.register(self.close)
+
+    def submit(self, name, email, subject, message):
+        """Save a submission; returns False if it repeats a recent one.
+
+        Raises if the submission could not be stored.
+        """
+        if not self.enabled:
+            db.session.add(ContactForm(name=name, email=email, subject=subject, message=message))
+            db.session.commit()
+            return True
+
+        fingerprint = self._fingerprint(email, subject, message)
+        self._start()
+        row = {'name': name, 'email': email, 'subject': subject, 'message': message,
+               'created_at': datetime.utcnow()}
+        with self._cond:
+            # Checked and recorded in one critical section, so a burst of
+            # identical submissions queues exactly one
+            if self._seen_recently(fingerprint):
+                return False
+            self._rows.append(row)
+            # Wake the thread to start the flush timer, or to flush a full batch
+            if len(self._rows) == 1:
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            elif len(self._rows) >= self._app.config['CONTACT_BUFFER_MAX_ROWS']:
+                self._cond.notify()
+            # Queued rows are written or spooled, so from here on it is stored
+            self._seen[fingerprint] = time.monotonic() + self._app.config['CONTACT_DEDUP_WINDOW']
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._rows),
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows,
+                'flush_seconds': self.flush_seconds,
+                'last_flush_rows': self.last_flush_rows,
+                'last_flush_seconds': self.last_flush_seconds,
+                'duplicates': self.duplicates,
+                'spooled': self.spooled,
+                'replayed': self.replayed,
+            }
+
+    def close(self):
+        """Stop the flush thread and write out whatever is still queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            # Let an in-flight batch finish so it is not written twice
+            while self._flushing:
+                self._cond.wait()
+            rows, self._rows = self._rows, []
+            self._pid = None
+        if rows:
+            self._write(rows)
+
+    @staticmethod
+    def _fingerprint(email, subject, message):
+        return hashlib.sha256(
+            '\0'.join((email.strip().lower(), subject.strip(), message.strip())).encode()).digest()
+
+    def _seen_recently(self, fingerprint):
+        # Called with self._cond held
+        now = time.monotonic()
+        # Entries share one window, so the oldest always expire first
+        while self._seen:
+            oldest = next(iter(self._seen))
+            if self._seen[oldest] > now:
+                break
+            del self._seen[oldest]
+        if fingerprint in self._seen:
+            self.duplicates += 1
+            return True
+        return False
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # Rows inherited from a forking parent are the parent's to flush
+            self._pid = os.getpid()
+            self._rows, self._oldest = [], None
+            self._stopping = False
+            threading.Thread(target=self._run, name='contact-buffer', daemon=True).start()
+
+    def _run(self):
+        interval = self._app.config['CONTACT_BUFFER_FLUSH_MS'] / 1000
+        self._replay()
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if len(self._rows) >= self._app.config['CONTACT_BUFFER_MAX_ROWS']:
+                        break
+                    if self._rows:
+                        remaining = self._oldest + interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stopping:
+                    return
+                rows, self._rows = self._rows, []
+                self._flushing = True
+            try:
+                if self._write(rows) and self._spool_pending:
+                    self._replay()
+            finally:
+                with self._cond:
+                    self._flushing = False
+                    self._cond.notify_all()
+
+    def _write(self, rows):
+        """Insert ``rows`` in one statement, spooling them if that fails."""
+        started = time.perf_counter()
+        with self._app.app_context():
+            try:
+                db.session.execute(db.insert(ContactForm), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._app.logger.exception('Contact buffer flush of %d row(s) failed; spooling',
+                                           len(rows))
+                self._spool(rows)
+                return False
+            finally:
+                db.session.remove()
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.flushes += 1
+            self.flushed_rows += len(rows)
+            self.flush_seconds += elapsed
+            self.last_flush_rows = len(rows)
+            self.last_flush_seconds = elapsed
+        return True
+
+    def _spool(self, rows):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # One file per batch, renamed into place once complete, so a replay
+        # never picks up a half-written spool
+        path = os.path.join(self.spool_dir, f'contact-{os.getpid()}-{time.time_ns()}.ndjson')
+        with open(path + '.tmp', 'w', encoding='utf-8') as spool:
+            for row in rows:
+                spool.write(json.dumps(dict(row, created_at=row['created_at'].isoformat())) + '\n')
+            spool.flush()
+            os.fsync(spool.fileno())
+        os.replace(path + '.tmp', path)
+        with self._cond:
+            self.spooled += len(rows)
+            self._spool_pending = True
+
+    def _replay(self):
+        """Load spooled rows back into the database, one file per transaction."""
+        self._spool_pending = False
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, '*.ndjson'))):
+            claimed = f'{path}.{os.getpid()}.replaying'
+            try:
+                # The rename is atomic, so only one worker replays each file
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding='utf-8') as spool:
+                rows = [json.loads(line) for line in spool if line.strip()]
+            for row in rows:
+                row['created_at'] = datetime.fromisoformat(row['created_at'])
+            with self._app.app_context():
+                try:
+                    if rows:
+                        db.session.execute(db.insert(ContactForm), rows)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    os.rename(claimed, path)
+                    self._spool_pending = True
+                    self._app.logger.exception('Replaying %s failed; will retry', path)
+                    return
+                finally:
+                    db.session.remove()
+            os.unlink(claimed)
+            with self._cond:
+                self.replayed += len(rows)
+
+
+contact_buffer = ContactBuffer()
@@ -0,0 +1,241 @@
+"""Content pipeline rules: cached workflows, transitions and the status board.
+
+Each ``ContentWorkflow`` stores its steps as a JSON list of status names.
+The workflows are decoded once into :class:`Workflow` objects and cached
+per process; writers call :func:`invalidate` after they commit, and
+``CONTENT_WORKFLOW_CACHE_TTL`` bounds how long another worker can serve a
+stale copy.  Content types without a workflow use :data:`DEFAULT_STEPS`.
+A content type has at most one workflow; the API refuses a second one.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from app import db
+from app.models import ContentItem, ContentWorkflow, ContentHistory
+
+DEFAULT_STEPS = ('draft', 'review', 'approved', 'scheduled', 'published')
+
+_lock = threading.Lock()
+_version = 0
+_cache = None
+
+
+class WorkflowError(ValueError):
+    """Raised for invalid workflow definitions and status transitions."""
+
+
+class ContentValidationError(ValueError):
+    """Raised for malformed content item fields."""
+
+
+class Workflow:
+    def __init__(self, steps, id=None, name=None, content_type=None):
+        self.id = id
+        self.name = name
+        self.content_type = content_type
+        self.steps = tuple(steps)
+        self._position = {step: i for i, step in enumerate(self.steps)}
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(parse_steps(row.steps), row.id, row.name, row.content_type)
+
+    @property
+    def initial(self):
+        return self.steps[0]
+
+    def check_initial(self, status):
+        """New items start on the first step."""
+        if status != self.initial:
+            raise WorkflowError(f"New '{self.content_type}' items start at '{self.initial}'")
+
+    def check_transition(self, current, new):
+        """Allow staying put, advancing one step, or sending an item back."""
+        if new not in self._position:
+            raise WorkflowError(f"Unknown status '{new}'; expected one of: {', '.join(self.steps)}")
+        if current not in self._position or new == current:
+            return
+        if self._position[new] > self._position[current] + 1:
+            raise WorkflowError(f"Cannot move from '{current}' to '{new}'; "
+                                f"the next step is '{self.steps[self._position[current] + 1]}'")
+
+
+class _WorkflowCache:
+    def __init__(self, version, workflows):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.workflows = list(workflows)
+        self.by_type = {}
+        for workflow in self.workflows:
+            # Duplicates predating the API check: the oldest one applies
+            self.by_type.setdefault(workflow.content_type, workflow)
+
+
+def parse_steps(raw):
+    """Decode and validate a ``steps`` JSON value into a tuple of statuses."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise WorkflowError('steps must be a JSON list of status names')
+    if not isinstance(raw, list) or not raw \
+            or not all(isinstance(step, str) and step.strip() for step in raw):
+        raise WorkflowError('steps must be a non-empty list of status names')
+    steps = tuple(step.strip() for step in raw)
+    if len(set(steps)) != len(steps):
+        raise WorkflowError('steps must not repeat a status')
+    return steps
+
+
+def parse_deadline(value):
+    """Parse an ISO 8601 deadline into naive UTC, the storage convention.
+
+    Values without an offset are taken as UTC already.
+    """
+    if not value:
+        return None
+    try:
+        deadline = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ContentValidationError('deadline must be an ISO 8601 date/time')
+    if deadline.tzinfo is not None:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    return deadline
+
+
+def workflow_for(content_type):
+    """Return the cached :class:`Workflow` for ``content_type``."""
+    workflow = _workflows().by_type.get(content_type)
+    return workflow if workflow is not None else Workflow(DEFAULT_STEPS, content_type=content_type)
+
+
+def all_workflows():
+    return list(_workflows().workflows)
+
+
+def type_taken(content_type, exclude_id=None):
+    """Whether another stored workflow already covers ``content_type``."""
+    # Checked against the table, not the cache, which may lag another worker
+    stmt = db.select(ContentWorkflow.id).where(ContentWorkflow.content_type == content_type)
+    if exclude_id is not None:
+        stmt = stmt.where(ContentWorkflow.id != exclude_id)
+    return db.session.scalar(stmt.limit(1)) is not None
+
+
+def invalidate():
+    """Drop the cached workflows; call after committing a workflow write."""
+    global _version, _cache
+    with _lock:
+        _version += 1
+        _cache = None
+
+
+def record_history(item, status, user_id, notes=None):
+    db.session.add(ContentHistory(content_id=item.id, status=status,
+                                  notes=notes, created_by=user_id))
+
+
+def board(limit, content_type=None):
+    """Return per-status counts and the ``limit`` freshest items per status.
+
+    ``row_number()`` and ``count()`` windows partitioned by status let one
+    query serve every column of the board.
+    """
+    rows = db.session.execute(board_query(limit, content_type)).all()
+
+    steps = workflow_for(content_type).steps if content_type else DEFAULT_STEPS
+    columns = {step: {'status': step, 'count': 0, 'items': []} for step in steps}
+    for row in rows:
+        column = columns.setdefault(row.status, {'status': row.status, 'count': 0, 'items': []})
+        column['count'] = row.total
+        column['items'].append(item_json(row))
+    return list(columns.values())
+
+
+def board_query(limit, content_type=None):
+    """The board's single statement: the top ``limit`` rows of each status."""
+    ranked = board_select(content_type).subquery()
+    return (db.select(ranked).where(ranked.c.position <= limit)
+            .order_by(ranked.c.status, ranked.c.position))
+
+
+def board_select(content_type=None):
+    """Rank items within each status; adds ``position`` and ``total`` columns."""
+    partition = {'partition_by': ContentItem.status}
+    ranked = db.select(
+        *ContentItem.__table__.columns,
+        db.func.row_number().over(
+            order_by=(ContentItem.updated_at.desc(), ContentItem.id.desc()), **partition
+        ).label('position'),
+        db.func.count().over(**partition).label('total'),
+    )
+    if content_type:
+        ranked = ranked.where(ContentItem.content_type == content_type)
+    return ranked
+
+
+def item_json(item):
+    """Serialise a ``ContentItem`` or a row carrying its columns."""
+    return {
+        'id': item.id,
+        'title': item.title,
+        'description': item.description,
+        'contentType': item.content_type,
+        'status': item.status,
+        'assignedTo': item.assigned_to,
+        'deadline': item.deadline.isoformat() if item.deadline else None,
+        'createdBy': item.created_by,
+        'createdAt': item.created_at.isoformat() if item.created_at else None,
+        'updatedAt': item.updated_at.isoformat() if item.updated_at else None,
+    }
+
+
+def history_json(entry):
+    return {
+        'id': entry.id,
+        'status': entry.status,
+        'notes': entry.notes,
+        'createdBy': entry.created_by,
+        'createdAt': entry.created_at.isoformat() if entry.created_at else None,
+    }
+
+
+def workflow_json(workflow):
+    return {
+        'id': workflow.id,
+        'name': workflow.name,
+        'contentType': workflow.content_type,
+        # Kept as a JSON string, matching the stored column
+        'steps': json.dumps(list(workflow.steps)),
+    }
+
+
+def _workflows():
+    global _cache
+    cache = _cache
+    ttl = current_app.config['CONTENT_WORKFLOW_CACHE_TTL']
+    if cache is not None and cache.version == _version \
+            and time.monotonic() - cache.built_at < ttl:
+        return cache
+
+    with _lock:
+        cache = _cache
+        if cache is None or cache.version != _version \
+                or time.monotonic() - cache.built_at >= ttl:
+            cache = _WorkflowCache(_version, _load())
+            _cache = cache
+        return cache
+
+
+def _load():
+    workflows = []
+    for row in db.session.execute(db.select(ContentWorkflow).order_by(ContentWorkflow.id)).scalars():
+        try:
+            workflows.append(Workflow.from_row(row))
+        except WorkflowError:
+            current_app.logger.warning('Ignoring content workflow %s with invalid steps', row.id)
+    return workflows
@@ -0,0 +1,370 @@
+"""Typeahead search over the employee directory.
+
+Every user's name, username, email and department are broken into
+lowercase terms (whole words, plus the full username and email), and the
+terms are kept in one sorted array next to a parallel array of user ids.
+A query word matches the ``bisect`` range of terms starting with it.  A
+query of several words intersects those ranges as sets, and the narrowest
+range goes first.  Results come back in name order.  Department and role
+facet counts cover every text match, before the optional ``department`` and
+``role`` filters are applied.  Counts for the short, broad prefixes are kept
+precomputed so a one-letter query never counts tens of thousands of users.
+Identical queries are answered from a small cache until the next change.
+
+The index is built on first use per process and then kept up to date
+incrementally from committed ``User`` inserts, updates and deletes.  Core
+bulk inserts bypass those events, so importers call :func:`invalidate`.
+``DIRECTORY_INDEX_TTL`` bounds how long a worker serves an index that
+another process has changed; the rebuild runs in the background while the
+old index keeps answering.
+
+Known limitation: the 5 ms p99 target for 100k users is met by narrow
+queries (p50 about 1.5 ms), but a word shared by ~10% of users, such as a
+department name or a common first name, still costs 7-9 ms uncached
+because every match is intersected and counted for the facets.  Repeats of
+such a query come from the result cache.
+"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.cache import TTLCache
+from app.models import User
+
+FIELDS = ('id', 'username', 'full_name', 'email', 'department', 'title', 'role')
+WORD = re.compile(r'\w+')
+# Facet counts are kept up to date for every term prefix up to this length,
+# so the broad one- to three-letter queries never count their matches
+PREFIX_FACETS = 3
+RANK_STEP = 1 << 16
+# Walk the name order instead of sorting once matches are this much denser
+# than limit / users; clustered names (a common first name) make walking cost more
+SCAN_DENSITY = 16
+
+
+class _Index:
+    def __init__(self, rows=()):
+        self.users = {}
+        self.term_blobs = {}
+        self.pairs = {}
+        self.facets = {'': Counter()}
+        self.departments = {}
+        self.roles = {}
+        entries = []
+        names = []
+        for row in rows:
+            record = tuple(row)
+            user_id = record[0]
+            terms = self._remember(record)
+            entries.extend((term, user_id) for term in terms)
+            names.append((_name_key(record), user_id))
+        entries.sort()
+        names.sort()
+        self.terms = [term for term, _ in entries]
+        self.ids = [user_id for _, user_id in entries]
+        self.by_name = names
+        self.name_ids = [user_id for _, user_id in names]
+        self._renumber()
+
+    def add(self, record):
+        user_id = record[0]
+        for term in self._remember(record):
+            position = bisect_left(self.terms, term)
+            # Keep (term, id) order inside a run of equal terms
+            while position < len(self.terms) and self.terms[position] == term \
+                    and self.ids[position] < user_id:
+                position += 1
+            self.terms.insert(position, term)
+            self.ids.insert(position, user_id)
+        entry = (_name_key(record), user_id)
+        position = bisect_left(self.by_name, entry)
+        self.by_name.insert(position, entry)
+        self.name_ids.insert(position, user_id)
+        before = self.rank[self.name_ids[position - 1]] if position else -RANK_STEP
+        after = (self.rank[self.name_ids[position + 1]] if position + 1 < len(self.name_ids)
+                 else before + 2 * RANK_STEP)
+        if after - before < 2:
+            self._renumber()
+        else:
+            self.rank[user_id] = (before + after) // 2
+
+    def remove(self, user_id):
+        record = self.users.pop(user_id, None)
+        if record is None:
+            return
+        terms = self.term_blobs.pop(user_id)[1:].split('\0')
+        pair = self.pairs.pop(user_id)
+        for prefix in _short_prefixes(terms):
+            counts = self.facets[prefix]
+            counts[pair] -= 1
+            if not counts[pair]:
+                del counts[pair]
+                if not counts and prefix:
+                    del self.facets[prefix]
+        self.departments[pair[0]].discard(user_id)
+        self.roles[pair[1]].discard(user_id)
+        for term in terms:
+            position = bisect_left(self.terms, term)
+            while self.ids[position] != user_id:
+                position += 1
+            del self.terms[position]
+            del self.ids[position]
+        position = bisect_left(self.by_name, (_name_key(record), user_id))
+        del self.by_name[position]
+        del self.name_ids[position]
+        del self.rank[user_id]
+
+    def _renumber(self):
+        # Sparse name-order ranks, so an insert usually just takes a midpoint
+        self.rank = {user_id: position * RANK_STEP for position, user_id in enumerate(self.name_ids)}
+
+    def _remember(self, record):
+        user_id = record[0]
+        terms = _terms(record)
+        pair = (record[4], record[6])
+        self.users[user_id] = record
+        # '\0'-joined so one substring test checks every term's prefix
+        self.term_blobs[user_id] = '\0' + '\0'.join(terms)
+        self.pairs[user_id] = pair
+        self.departments.setdefault(pair[0], set()).add(user_id)
+        self.roles.setdefault(pair[1], set()).add(user_id)
+        for prefix in _short_prefixes(terms):
+            counts = self.facets.get(prefix)
+            if counts is None:
+                counts = self.facets[prefix] = Counter()
+            counts[pair] += 1
+        return terms
+
+    def search(self, words, limit, department=None, role=None):
+        """Return ``(total, facet pair counts, first user ids by name)``."""
+        matches = self.match(words)
+        if len(words) <= 1 and len(words[0] if words else '') <= PREFIX_FACETS:
+            counts = self.facets.get(words[0] if words else '', Counter())
+        else:
+            counts = Counter(map(self.pairs.__getitem__, matches))
+        if department is not None:
+            matches = self.departments.get(department, set()).intersection(matches)
+        if role is not None:
+            matches = self.roles.get(role, set()).intersection(matches)
+        return len(matches), counts, self.first_by_name(matches, limit)
+
+    def match(self, words):
+        """Ids of users with a term starting with each word (all users if none)."""
+        if not words:
+            return self.users.keys()
+        ranges = sorted((self._range(word) + (word,) for word in words), key=lambda r: r[1] - r[0])
+        lo, hi, _ = ranges[0]
+        matches = set(self.ids[lo:hi])
+        for lo, hi, word in ranges[1:]:
+            if not matches:
+                break
+            if hi - lo > 4 * len(matches):
+                # Cheaper to check the few candidates than to scan a broad range
+                blobs, needle = self.term_blobs, '\0' + word
+                matches = {user_id for user_id in matches if needle in blobs[user_id]}
+            else:
+                matches.intersection_update(self.ids[lo:hi])
+        return matches
+
+    def first_by_name(self, matches, limit):
+        if len(matches) == len(self.users):
+            return self.name_ids[:limit]
+        if len(matches) * len(matches) > SCAN_DENSITY * limit * len(self.users):
+            # Dense matches turn up early in name order; filter() keeps the walk out of Python
+            return list(islice(filter(matches.__contains__, self.name_ids), limit))
+        return heapq.nsmallest(limit, matches, key=self.rank.__getitem__)
+
+    def _range(self, word):
+        return bisect_left(self.terms, word), bisect_left(self.terms, word + '\uffff')
+
+
+class EmployeeDirectory:
+    def __init__(self):
+        self.results = TTLCache()
+        self._index = None
+        self._built_at = 0
+        self._lock = threading.RLock()
+        self._pending = None  # updates seen while a rebuild is loading
+        self._rebuilding = False
+        self.version = 0
+
+    def configure(self, app):
+        self.results.configure(app.config['DIRECTORY_CACHE_SIZE'], app.config['DIRECTORY_INDEX_TTL'])
+
+    def search(self, query, limit=10, department=None, role=None):
+        key = (self.version, query, limit, department, role)
+        payload = self.results.get(key)
+        if payload is not None:
+            return payload
+
+        index = self._current()
+        # Whitespace-separated, so "jane.d" can still match a whole email
+        words = query.lower().split()
+        with self._lock:
+            total, counts, found = index.search(words, limit, department, role)
+            results = [_employee_json(index.users[user_id]) for user_id in found]
+            # counts may be the index's live prefix Counter, which apply() mutates
+            facets = {'department': Counter(), 'role': Counter()}
+            for (department_name, role_name), count in counts.items():
+                facets['department'][department_name] += count
+                facets['role'][role_name] += count
+        facets = {name: dict(counter.most_common()) for name, counter in facets.items()}
+        payload = {'query': query, 'total': total, 'results': results, 'facets': facets}
+        self.results.set(key, payload)
+        return payload
+
+    def apply(self, changes):
+        """Apply committed ``{user_id: record or None}`` changes to the index."""
+        with self._lock:
+            if self._index is None:
+                return
+            changes = {user_id: record for user_id, record in changes.items()
+                       if self._index.users.get(user_id) != record}
+            if not changes:
+                return
+            if self._pending is not None:
+                self._pending.append(changes)
+            for user_id, record in changes.items():
+                self._index.remove(user_id)
+                if record is not None:
+                    self._index.add(record)
+            self.version += 1
+
+    def invalidate(self):
+        """Rebuild from the database on next use (after bulk writes)."""
+        with self._lock:
+            self._built_at = 0
+            self.version += 1
+
+    def _current(self):
+        with self._lock:
+            index = self._index
+            if index is None:
+                self._index = index = self._load()
+                self._built_at = time.monotonic()
+                self.version += 1
+                return index
+            stale = time.monotonic() - self._built_at >= current_app.config['DIRECTORY_INDEX_TTL']
+            if stale and not self._rebuilding:
+                self._rebuilding = True
+                self._pending = []
+                app = current_app._get_current_object()
+                threading.Thread(target=self._rebuild, args=(app,), name='directory-rebuild',
+                                 daemon=True).start()
+            return index
+
+    def _rebuild(self, app):
+        try:
+            with app.app_context():
+                index = self._load()
+        except Exception:
+            app.logger.exception('Rebuilding the employee directory index failed')
+            index = None
+        with self._lock:
+            if index is not None:
+                # Changes committed while loading may predate the snapshot; replaying is idempotent
+                for changes in self._pending:
+                    for user_id, record in changes.items():
+                        index.remove(user_id)
+                        if record is not None:
+                            index.add(record)
+                self._index = index
+                self.version += 1
+            self._built_at = time.monotonic()
+            self._pending = None
+            self._rebuilding = False
+
+    @staticmethod
+    def _load():
+        columns = [getattr(User, field) for field in FIELDS]
+        rows = db.session.execute(db.select(*columns).execution_options(yield_per=10000))
+        try:
+            index = _Index(rows)
+        finally:
+            db.session.rollback()
+        return index
+
+
+def _terms(record):
+    _, username, full_name, email, department, _, _ = record
+    terms = set()
+    for value in (username, full_name, email, department):
+        if value:
+            value = value.lower()
+            terms.update(WORD.findall(value))
+            terms.add(value)
+    return tuple(sorted(terms))
+
+
+def _short_prefixes(terms):
+    prefixes = {''}
+    for term in terms:
+        for length in range(1, min(len(term), PREFIX_FACETS) + 1):
+            prefixes.add(term[:length])
+    return prefixes
+
+
+def _name_key(record):
+    return (record[2] or '').lower()
+
+
+def _employee_json(record):
+    user_id, username, full_name, email, department, title, role = record
+    return {
+        'id': user_id,
+        'username': username,
+        'fullName': full_name,
+        'email': email,
+        'department': department,
+        'title': title,
+        'role': role,
+    }
+
+
+@event.listens_for(User, 'after_insert')
+def _user_added(mapper, connection, target):
+    _remember(target, tuple(getattr(target, field) for field in FIELDS))
+
+
+@event.listens_for(User, 'after_update')
+def _user_changed(mapper, connection, target):
+    # Most updates (login-time password rehashes, updated_at) leave the
+    # indexed fields alone and must not clear the results cache
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in FIELDS):
+        _remember(target, tuple(getattr(target, field) for field in FIELDS))
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _remember(target, None)
+
+
+def _remember(target, record):
+    session = object_session(target)
+    if session is not None and directory._index is not None:
+        session.info.setdefault('directory_users', {})[target.id] = record
+
+
+@event.listens_for(Session, 'after_commit')
+def _index_committed(session):
+    changes = session.info.pop('directory_users', None)
+    if changes:
+        directory.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_uncommitted(session):
+    session.info.pop('directory_users', None)
+
+
+directory = EmployeeDirectory()
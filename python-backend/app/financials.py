@@ -0,0 +1,216 @@
+"""Versioned, in-process snapshot of the financials dataset.
+
+The financials page and the ``/api/financials/*`` endpoints both read from a
+single precomputed :class:`FinancialsSnapshot` instead of querying the four
+financial tables on every hit.  Writers call :func:`invalidate` after they
+commit; ``FINANCIALS_CACHE_TTL`` bounds how long another worker process can
+serve a snapshot it has not been told about.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import FinancialMetric, RevenueBreakdown, YearlyFinancial, InvestorEvent
+
+_lock = threading.Lock()
+_version = 0
+_snapshot = None
+
+
+class FinancialsSnapshot:
+    """Immutable view of the financial tables plus their pre-encoded JSON."""
+
+    def __init__(self, version, metrics, revenue_breakdown, yearly, investor_events):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.metrics = metrics
+        self.revenue_breakdown = revenue_breakdown
+        self.yearly = yearly
+        self.investor_events = investor_events
+
+        self.breakdown_years = tuple(sorted({item.year for item in revenue_breakdown}))
+        self._breakdown_payloads = {}  # (first, last) index into breakdown_years -> JSON
+
+        dumps = current_app.json.dumps
+        self.payloads = {
+            'metrics': dumps([_metric_json(m) for m in metrics]),
+            'revenue_breakdown': dumps([_breakdown_json(b) for b in revenue_breakdown]),
+            'yearly': dumps([_yearly_json(y) for y in yearly]),
+            'investor_events': dumps([_event_json(e) for e in investor_events]),
+        }
+
+    @property
+    def has_data(self):
+        return bool(self.metrics and self.revenue_breakdown and self.yearly)
+
+    @property
+    def latest_breakdown(self):
+        """Breakdown rows for the most recent year on record."""
+        if not self.breakdown_years:
+            return ()
+        return self.breakdown(self.breakdown_years[-1], self.breakdown_years[-1])
+
+    def breakdown(self, start=None, end=None):
+        """Breakdown rows for years ``start``..``end`` (inclusive, either open)."""
+        return tuple(item for item in self.revenue_breakdown
+                     if (start is None or item.year >= start) and (end is None or item.year <= end))
+
+    def breakdown_payload(self, start=None, end=None):
+        # Snap the caller's bounds to the years on record, so the cache holds
+        # at most one entry per pair of stored years whatever gets asked for
+        years = self.breakdown_years
+        first = 0 if start is None else bisect_left(years, start)
+        last = len(years) if end is None else bisect_right(years, end)
+        if first == 0 and last == len(years):
+            return self.payloads['revenue_breakdown']
+        if first >= last:
+            first = last = 0
+        payload = self._breakdown_payloads.get((first, last))
+        if payload is None:
+            rows = self.breakdown(years[first], years[last - 1]) if first < last else ()
+            payload = current_app.json.dumps([_breakdown_json(b) for b in rows])
+            # Racing requests store identical bytes, so no lock is needed
+            self._breakdown_payloads[(first, last)] = payload
+        return payload
+
+    def upcoming_events(self, today, limit=None):
+        events = [e for e in self.investor_events if e.event_date and e.event_date >= today]
+        return events[:limit] if limit else events
+
+
+def get_snapshot():
+    """Return the current snapshot, rebuilding it if stale or invalidated."""
+    global _snapshot
+    snapshot = _snapshot
+    ttl = current_app.config['FINANCIALS_CACHE_TTL']
+    if snapshot is not None and snapshot.version == _version \
+            and time.monotonic() - snapshot.built_at < ttl:
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != _version \
+                or time.monotonic() - snapshot.built_at >= ttl:
+            snapshot = _build(_version)
+            _snapshot = snapshot
+        return snapshot
+
+
+def invalidate():
+    """Drop the cached snapshot; call after committing a financial write."""
+    global _version, _snapshot
+    with _lock:
+        _version += 1
+        _snapshot = None
+
+
+def _build(version):
+    return FinancialsSnapshot(
+        version,
+        metrics=_records(FinancialMetric.query.order_by(FinancialMetric.display_order)),
+        revenue_breakdown=_records(RevenueBreakdown.query.order_by(RevenueBreakdown.year,
+                                                                   RevenueBreakdown.display_order)),
+        yearly=_records(YearlyFinancial.query.order_by(YearlyFinancial.year.desc())),
+        investor_events=_records(InvestorEvent.query.order_by(InvestorEvent.event_date)),
+    )
+
+
+def pivot_select(start=None, end=None):
+    """Per-year category totals, grouped in ``ix_revenue_breakdown_year_order`` order."""
+    stmt = (db.select(RevenueBreakdown.year, RevenueBreakdown.display_order, RevenueBreakdown.category,
+                      func.sum(RevenueBreakdown.percentage).label('percentage'))
+            .group_by(RevenueBreakdown.year, RevenueBreakdown.display_order, RevenueBreakdown.category)
+            .order_by(RevenueBreakdown.year, RevenueBreakdown.display_order, RevenueBreakdown.category))
+    if start is not None:
+        stmt = stmt.where(RevenueBreakdown.year >= start)
+    if end is not None:
+        stmt = stmt.where(RevenueBreakdown.year <= end)
+    return stmt
+
+
+def revenue_pivot(start=None, end=None):
+    """Return category x year percentages from one grouped query.
+
+    Categories are ordered by their lowest ``display_order``; a year without
+    a row for a category gets ``None``.
+    """
+    years = []
+    cells = {}
+    order = {}
+    for row in db.session.execute(pivot_select(start, end)):
+        if not years or years[-1] != row.year:
+            years.append(row.year)
+        # Grouping includes display_order so the index covers it; a category
+        # listed under two orders in one year is merged back here
+        by_year = cells.setdefault(row.category, {})
+        by_year[row.year] = by_year.get(row.year, 0) + row.percentage
+        order[row.category] = min(order.get(row.category, row.display_order or 0), row.display_order or 0)
+    categories = sorted(cells, key=lambda category: (order[category], category))
+    return {
+        'years': years,
+        'categories': [{'category': category,
+                        'percentages': [cells[category].get(year) for year in years]}
+                       for category in categories],
+    }
+
+
+def _records(query):
+    # Detach from the session so the snapshot can outlive the request
+    columns = query.column_descriptions[0]['entity'].__table__.columns
+    return tuple(
+        SimpleNamespace(**{column.key: getattr(row, column.key) for column in columns})
+        for row in query.all()
+    )
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _metric_json(metric):
+    return {
+        'id': metric.id,
+        'name': metric.name,
+        'value': metric.value,
+        'description': metric.description,
+        'icon': metric.icon,
+        'displayOrder': metric.display_order,
+        'createdAt': _isoformat(metric.created_at),
+    }
+
+
+def _breakdown_json(item):
+    return {
+        'id': item.id,
+        'category': item.category,
+        'percentage': item.percentage,
+        'colorClass': item.color_class,
+        'displayOrder': item.display_order,
+        'year': item.year,
+        'createdAt': _isoformat(item.created_at),
+    }
+
+
+def _yearly_json(item):
+    return {
+        'id': item.id,
+        'year': item.year,
+        'revenue': item.revenue,
+        'growthPercentage': item.growth_percentage,
+        'profit': item.profit,
+        'createdAt': _isoformat(item.created_at),
+    }
+
+
+def _event_json(event):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'eventDate': _isoformat(event.event_date),
+    }
@@ -1,23 +1,29 @@
 from flask import render_template, request, redirect, url_for, flash
 from app.main import bp
-from app import db
-from app.models import ContactForm, FinancialMetric, RevenueBreakdown, YearlyFinancial, InvestorEvent
+from app import db, page_cache
+from app import financials as financial_snapshot
+from app.contact_buffer import contact_buffer
+from app.models import FinancialMetric, RevenueBreakdown, YearlyFinancial, InvestorEvent
 from datetime import datetime
 import logging
 
 @bp.route('/')
+@page_cache.cached
 def index():
     return render_template('index.html', active_page='home')
 
 @bp.route('/about')
+@page_cache.cached
 def about():
     return render_template('about.html', active_page='about')
 
 @bp.route('/services')
+@page_cache.cached
 def services():
     return render_template('services.html', active_page='services')
 
 @bp.route('/team')
+@page_cache.cached
 def team():
     return render_template('team.html', active_page='team')
 
@@ -36,17 +42,10 @@ def contact():
                 flash('Please fill in all fields', 'danger')
                 return render_template('contact.html', active_page='contact')
             
-            # Create new contact form submission
-            new_contact = ContactForm(
-                name=name,
-                email=email,
-                subject=subject,
-                message=message
-            )
-            
-            # Save to database
-            db.session.add(new_contact)
-            db.session.commit()
+            # Save (or queue, with CONTACT_BUFFER_ENABLED); a queued repeat of a
+            # recent submission is dropped but acknowledged the same way.  A
+            # failed save raises and is reported below, never as sent.
+            contact_buffer.submit(name, email, subject, message)
             
             flash('Your message has been sent! We will get back to you soon.', 'success')
             return redirect(url_for('main.contact'))
@@ -59,6 +58,7 @@ def contact():
     return render_template('contact.html', active_page='contact')
 
 @bp.route('/careers')
+@page_cache.cached
 def careers():
     return render_template('careers.html', active_page='careers')
 
@@ -66,32 +66,20 @@ def careers():
 def financials():
     """Render the financials page with data from the database if available."""
     try:
-        # Fetch financial metrics from database
-        financial_metrics = FinancialMetric.query.order_by(FinancialMetric.display_order).all()
-        
-        # Fetch revenue breakdown from database
-        revenue_breakdown = RevenueBreakdown.query.order_by(RevenueBreakdown.display_order).all()
+        snapshot = financial_snapshot.get_snapshot()
         
-        # Fetch yearly financial data from database
-        yearly_financials = YearlyFinancial.query.order_by(YearlyFinancial.year.desc()).limit(5).all()
-        
-        # Fetch upcoming investor events from database
-        investor_events = InvestorEvent.query.filter(
-            InvestorEvent.event_date >= datetime.now().date()
-        ).order_by(InvestorEvent.event_date).limit(3).all()
+        # Only the next few investor events and the last five years are shown
+        investor_events = snapshot.upcoming_events(datetime.now().date(), limit=3)
         
         # If we don't have any data yet, we'll fall back to the template's static data
-        has_dynamic_data = (
-            financial_metrics and revenue_breakdown and 
-            yearly_financials and investor_events
-        )
+        has_dynamic_data = bool(snapshot.has_data and investor_events)
         
         return render_template(
             'financials.html', 
             active_page='financials',
-            financial_metrics=financial_metrics if has_dynamic_data else [],
-            revenue_breakdown=revenue_breakdown if has_dynamic_data else [],
-            yearly_financials=yearly_financials if has_dynamic_data else [],
+            financial_metrics=snapshot.metrics if has_dynamic_data else [],
+            revenue_breakdown=snapshot.latest_breakdown if has_dynamic_data else [],
+            yearly_financials=snapshot.yearly[:5] if has_dynamic_data else [],
             investor_events=investor_events if has_dynamic_data else [],
             has_dynamic_data=has_dynamic_data
         )
@@ -210,6 +198,7 @@ def init_financial_data():
         
         # Commit to database
         db.session.commit()
+        financial_snapshot.invalidate()
         
         return "Financial data initialized successfully!"
     
@@ -221,26 +210,3 @@ def init_financial_data():
 @bp.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
-from flask import render_template
-from app.main import bp
-from app.models import FinancialMetric, RevenueBreakdown, YearlyFinancial, InvestorEvent
-from flask_login import login_required
-
-@bp.route('/financials')
-@login_required
-def financials():
-    # Fetch real data from the database
-    financial_metrics = FinancialMetric.query.order_by(FinancialMetric.display_order).all()
-    revenue_breakdown = RevenueBreakdown.query.order_by(RevenueBreakdown.display_order).all()
-    yearly_financials = YearlyFinancial.query.order_by(YearlyFinancial.year.desc()).limit(5).all()
-    investor_events = InvestorEvent.query.order_by(InvestorEvent.event_date).all()
-    
-    has_dynamic_data = bool(financial_metrics and revenue_breakdown and yearly_financials)
-    
-    return render_template('financials.html', 
-                           active_page='financials',
-                           has_dynamic_data=has_dynamic_data,
-                           financial_metrics=financial_metrics,
-                           revenue_breakdown=revenue_breakdown,
-                           yearly_financials=yearly_financials,
-                           investor_events=investor_events)
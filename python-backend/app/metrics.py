@@ -0,0 +1,333 @@
+"""Per-request timing, SQL instrumentation and a Prometheus ``/metrics`` page.
+
+Every request records its latency, SQL statement count, SQL time and
+response size into per-endpoint histograms, and reports the same numbers
+to the browser in a ``Server-Timing`` header.  The bookkeeping is a couple
+of ``perf_counter`` calls and dictionary updates per request and per
+statement, which keeps it well below the noise on the API routes.
+
+``/metrics`` answers only clients in ``METRICS_ALLOWED_IPS`` or requests
+carrying ``Authorization: Bearer <METRICS_TOKEN>``; everyone else gets a 404.
+
+Each process keeps its own numbers, so behind several gunicorn workers a
+scrape would only see whichever worker answered.  With
+``PROMETHEUS_MULTIPROC_DIR`` set (requires the optional ``prometheus_client``
+package) the histograms and collector values are written to
+``prometheus_client``'s shared multiprocess files instead, and every scrape
+reports the sum over all live workers.
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self, label_names):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            snapshot = [(labels, list(counts), total, n)
+                        for labels, (counts, total, n) in self._series.items()]
+        for labels, counts, total, n in sorted(snapshot):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{base},le="+Inf"}} {n}'
+            yield f'{self.name}_sum{{{base}}} {total}'
+            yield f'{self.name}_count{{{base}}} {n}'
+
+
+class Metrics:
+    LABELS = ('endpoint', 'method', 'status')
+
+    def __init__(self):
+        self.latency = Histogram('http_request_duration_seconds',
+                                 'Request latency by endpoint.', LATENCY_BUCKETS)
+        self.sql_count = Histogram('http_request_sql_statements',
+                                   'SQL statements executed per request.', COUNT_BUCKETS)
+        self.sql_time = Histogram('http_request_sql_duration_seconds',
+                                  'Time spent in SQL per request.', LATENCY_BUCKETS)
+        self.size = Histogram('http_response_size_bytes',
+                              'Response body size (buffered responses only).', SIZE_BUCKETS)
+        self._collectors = {}
+        self._allowed = ()
+        self._token = ''
+        self._shared = None
+
+    def init_app(self, app):
+        if not app.config['METRICS_ENABLED']:
+            return
+        self._allowed = tuple(ipaddress.ip_network(address.strip(), strict=False)
+                              for address in app.config['METRICS_ALLOWED_IPS'].split(',')
+                              if address.strip())
+        self._token = app.config['METRICS_TOKEN']
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR') and self._shared is None:
+            try:
+                self._shared = MultiprocessExport(self.histograms)
+            except ImportError:
+                logging.warning('prometheus_client is not installed, /metrics reports one worker')
+        _listen_to_engines()
+        app.before_request(_start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def add_collector(self, name, collector):
+        """Register ``collector()`` returning ``[(name, type, help, value)]`` gauges/counters."""
+        self._collectors[name] = collector
+
+    def flush(self):
+        """Write this worker's latest collector values out (call before exit)."""
+        if self._shared is not None:
+            self._shared.sync(self._collectors.values(), force=True)
+
+    @property
+    def histograms(self):
+        return (self.latency, self.sql_count, self.sql_time, self.size)
+
+    def metrics_view(self):
+        if not self._authorized():
+            abort(404)
+        if self._shared is not None:
+            self._shared.sync(self._collectors.values(), force=True)
+            return current_app.response_class(self._shared.render(),
+                                              mimetype='text/plain; version=0.0.4')
+        return current_app.response_class(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render(self.LABELS))
+        for collector in self._collectors.values():
+            for name, kind, help, value in collector():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _finish_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        sql_count = g.get('_sql_count', 0)
+        sql_time = g.get('_sql_time', 0.0)
+        labels = (request.endpoint or 'unmatched', request.method, str(response.status_code))
+
+        observe = self._shared.observe if self._shared is not None else Histogram.observe
+        observe(self.latency, labels, elapsed)
+        observe(self.sql_count, labels, sql_count)
+        observe(self.sql_time, labels, sql_time)
+        if response.content_length is not None:
+            observe(self.size, labels, response.content_length)
+        if self._shared is not None:
+            self._shared.sync(self._collectors.values())
+
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+        response.headers.add('Server-Timing',
+                             f'db;dur={sql_time * 1000:.1f};desc="{sql_count} queries"')
+        return response
+
+    def _authorized(self):
+        if self._token and hmac.compare_digest(request.headers.get('Authorization', ''),
+                                               f'Bearer {self._token}'):
+            return True
+        try:
+            address = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            return False
+        return any(address in network for network in self._allowed)
+
+
+class MultiprocessExport:
+    """Request histograms and collector values in ``prometheus_client``'s
+    multiprocess files, summed over the live workers on every scrape."""
+
+    SYNC_INTERVAL = 1.0  # seconds between collector snapshots per worker
+
+    def __init__(self, histograms):
+        import prometheus_client
+        from prometheus_client import multiprocess
+
+        self._client = prometheus_client
+        self._multiprocess = multiprocess
+        self._histograms = {
+            histogram.name: prometheus_client.Histogram(
+                histogram.name, histogram.help, Metrics.LABELS, buckets=histogram.buckets,
+                registry=None)
+            for histogram in histograms
+        }
+        self._gauges = {}
+        self._counters = {}
+        self._exported = {}  # counter name -> this worker's total already added
+        self._synced = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, histogram, labels, value):
+        self._histograms[histogram.name].labels(*labels).observe(value)
+
+    def sync(self, collectors, force=False):
+        """Copy this worker's collector values into its multiprocess file."""
+        now = time.monotonic()
+        if not force and now - self._synced < self.SYNC_INTERVAL:
+            return
+        with self._lock:
+            self._synced = now
+            for collector in collectors:
+                for name, kind, help, value in collector():
+                    if kind == 'counter':
+                        self._count(name, help, value)
+                        continue
+                    gauge = self._gauges.get(name)
+                    if gauge is None:
+                        # Sizes add up across workers; "livesum" drops the
+                        # values of workers that have exited
+                        gauge = self._gauges[name] = self._client.Gauge(
+                            name, help, multiprocess_mode='livesum', registry=None)
+                    gauge.set(value)
+
+    def _count(self, name, help, total):
+        # Counter files outlive their worker, so totals survive max_requests
+        # recycling; collectors report running totals, counters take increments
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = self._client.Counter(name, help, registry=None)
+        previous = self._exported.get(name, 0)
+        # A total that went down was reset in this worker; count it from zero
+        increment = total - previous if total >= previous else total
+        if increment > 0:
+            counter.inc(increment)
+        self._exported[name] = total
+
+    def render(self):
+        registry = self._client.CollectorRegistry()
+        self._multiprocess.MultiProcessCollector(registry)
+        return self._client.generate_latest(registry)
+
+
+def _start_request():
+    g._metrics_start = time.perf_counter()
+    g._sql_count = 0
+    g._sql_time = 0.0
+
+
+_listening = False
+
+
+def _listen_to_engines():
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is not None and has_request_context() and '_metrics_start' in g:
+        g._sql_count += 1
+        g._sql_time += time.perf_counter() - started
+
+
+def cache_collector(prefix, cache):
+    """Expose a cache's ``stats()`` counters as ``<prefix>_*`` metrics."""
+    def collect():
+        stats = cache.stats()
+        return [
+            (f'{prefix}_hits_total', 'counter', 'Cache hits.', stats['hits']),
+            (f'{prefix}_misses_total', 'counter', 'Cache misses.', stats['misses']),
+            (f'{prefix}_evictions_total', 'counter', 'Entries evicted for space.', stats['evictions']),
+            (f'{prefix}_size', 'gauge', 'Entries currently cached.', stats['size']),
+        ]
+    return collect
+
+
+def scheduler_collector(scheduler):
+    def collect():
+        stats = scheduler.stats()
+        return [
+            ('content_scheduler_pending', 'gauge', 'Deadlines waiting in the scheduler.', stats['pending']),
+            ('content_scheduler_fired_total', 'counter', 'Scheduled transitions applied.', stats['fired']),
+            ('content_scheduler_leader', 'gauge', '1 in the process running the scheduler.', int(stats['leader'])),
+        ]
+    return collect
+
+
+def ratelimit_collector(limiter):
+    def collect():
+        stats = limiter.stats()
+        gauges = [
+            ('ratelimit_allowed_total', 'counter', 'Rate-limited requests let through.', stats['allowed']),
+            ('ratelimit_rejected_total', 'counter', 'Requests rejected with 429.', stats['rejected']),
+        ]
+        if stats['keys'] is not None:
+            gauges.append(('ratelimit_keys', 'gauge', 'Buckets held in this process.', stats['keys']))
+        return gauges
+    return collect
+
+
+def contact_buffer_collector(buffer):
+    def collect():
+        stats = buffer.stats()
+        return [
+            ('contact_buffer_pending', 'gauge', 'Submissions queued for the next flush.', stats['pending']),
+            ('contact_buffer_flushes_total', 'counter', 'Batched inserts written.', stats['flushes']),
+            ('contact_buffer_flushed_rows_total', 'counter', 'Rows written by batched inserts.',
+             stats['flushed_rows']),
+            ('contact_buffer_flush_seconds_total', 'counter', 'Time spent writing batches.',
+             stats['flush_seconds']),
+            ('contact_buffer_last_flush_rows', 'gauge', 'Rows in the most recent batch.',
+             stats['last_flush_rows']),
+            ('contact_buffer_last_flush_seconds', 'gauge', 'Duration of the most recent batch.',
+             stats['last_flush_seconds']),
+            ('contact_buffer_duplicates_total', 'counter', 'Repeated submissions dropped.',
+             stats['duplicates']),
+            ('contact_buffer_spooled_total', 'counter', 'Rows spooled to disk after a failed flush.',
+             stats['spooled']),
+            ('contact_buffer_replayed_total', 'counter', 'Spooled rows written back to the database.',
+             stats['replayed']),
+        ]
+    return collect
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,7 +1,8 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from app import db, login
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db, login, user_cache, hasher
 
 # ContactForm model moved from models.py to app/models.py
 class ContactForm(db.Model):
@@ -21,12 +22,17 @@ class User(UserMixin, db.Model):
     department = db.Column(db.String(64), nullable=False)
     title = db.Column(db.String(64), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='employee')
+    # Lets conditional GETs that embed user data notice profile changes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,17 +40,31 @@ class Document(db.Model):
     description = db.Column(db.Text)
     file_name = db.Column(db.String(256), nullable=False)
     mime_type = db.Column(db.String(64), nullable=False)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    # SHA-256 of the body in the content store; NULL until content is uploaded
+    content_hash = db.Column(db.String(64), index=True)
+    size = db.Column(db.BigInteger)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    author = db.relationship('User', foreign_keys=[uploaded_by])
+
+    # Keyset pagination order for /api/documents
+    __table_args__ = (db.Index('ix_document_created_at_id', 'created_at', 'id'),)
 
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(128), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_important = db.Column(db.Boolean, default=False)
 
+    author = db.relationship('User', foreign_keys=[created_by])
+
+    # Keyset pagination order for /api/announcements
+    __table_args__ = (db.Index('ix_announcement_created_at_id', 'created_at', 'id'),)
+
 class FinancialMetric(db.Model):
     """Model for storing key financial metrics like revenue growth, profit margin, etc."""
     id = db.Column(db.Integer, primary_key=True)
@@ -52,7 +72,7 @@ class FinancialMetric(db.Model):
     value = db.Column(db.Float, nullable=False)
     description = db.Column(db.Text)
     icon = db.Column(db.String(50))
-    display_order = db.Column(db.Integer, default=0)
+    display_order = db.Column(db.Integer, default=0, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -62,15 +82,19 @@ class RevenueBreakdown(db.Model):
     category = db.Column(db.String(100), nullable=False)
     percentage = db.Column(db.Float, nullable=False)
     color_class = db.Column(db.String(50), default="bg-primary")
-    display_order = db.Column(db.Integer, default=0)
+    display_order = db.Column(db.Integer, default=0, index=True)
     year = db.Column(db.Integer, nullable=False, default=datetime.now().year)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Year-ordered listing and a covering index for the category x year pivot
+    __table_args__ = (db.Index('ix_revenue_breakdown_year_order', 'year', 'display_order',
+                               'category', 'percentage'),)
+
 class YearlyFinancial(db.Model):
     """Model for storing yearly financial data including revenue, growth, profit, etc."""
     id = db.Column(db.Integer, primary_key=True)
-    year = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False, index=True)
     revenue = db.Column(db.Float, nullable=False)
     growth_percentage = db.Column(db.Float)
     profit = db.Column(db.Float)
@@ -82,7 +106,7 @@ class InvestorEvent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    event_date = db.Column(db.Date, nullable=False)
+    event_date = db.Column(db.Date, nullable=False, index=True)
 
 
 class ContentItem(db.Model):
@@ -91,13 +115,16 @@ class ContentItem(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     content_type = db.Column(db.String(50), nullable=False)  # blog, social, product
-    status = db.Column(db.String(50), nullable=False, default="draft")  # draft, review, approved, scheduled, published
-    assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'))
+    status = db.Column(db.String(50), nullable=False, default="draft", index=True)  # draft, review, approved, scheduled, published
+    assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     deadline = db.Column(db.DateTime)
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_content_item_created_at_id', 'created_at', 'id'),
+                      db.Index('ix_content_item_updated_at', 'updated_at'))
+
 class ContentWorkflow(db.Model):
     """Model for defining workflow templates for different content types"""
     id = db.Column(db.Integer, primary_key=True)
@@ -110,15 +137,54 @@ class ContentWorkflow(db.Model):
 class ContentHistory(db.Model):
     """Model for tracking content item history and changes"""
     id = db.Column(db.Integer, primary_key=True)
-    content_id = db.Column(db.Integer, db.ForeignKey('content_item.id'), nullable=False)
+    content_id = db.Column(db.Integer, db.ForeignKey('content_item.id'), nullable=False, index=True)
     status = db.Column(db.String(50), nullable=False)
     notes = db.Column(db.Text)
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class UserIdentity(UserMixin):
+    """Detached, read-only copy of a User row held in the login cache"""
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.full_name = user.full_name
+        self.email = user.email
+        self.department = user.department
+        self.title = user.title
+        self.role = user.role
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    identity = user_cache.get(int(id))
+    if identity is None:
+        user = User.query.get(int(id))
+        if user is None:
+            return None
+        identity = UserIdentity(user)
+        user_cache.set(user.id, identity)
+    return identity
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _evict_cached_user(mapper, connection, target):
+    # Only this process's cache; other workers age the entry out after
+    # USER_CACHE_TTL, which bounds how long a role change takes to apply
+    user_cache.pop(target.id)
+    # Evict again on commit so a reader racing the flush can't re-cache old values
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('evicted_users', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_users(session):
+    for user_id in session.info.pop('evicted_users', ()):
+        user_cache.pop(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_evicted_users(session):
+    session.info.pop('evicted_users', None)
+
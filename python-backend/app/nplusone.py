@@ -0,0 +1,74 @@
+"""Detect N+1 query patterns per request.
+
+Every statement a request executes is counted by its SQL text (parameters
+are bound separately, so the text is the statement's shape).  When one
+shape runs more than ``N_PLUS_ONE_THRESHOLD`` times the request is flagged:
+under ``TESTING`` it fails with :class:`NPlusOneError`, otherwise a warning
+is logged.  A threshold of 0 disables the detector, and views that repeat
+a statement on purpose (batched imports) call :func:`exempt`.
+
+It is a test-time tool: unless ``N_PLUS_ONE_THRESHOLD`` is set explicitly
+it runs only under ``TESTING``, so production processes do not pay for an
+engine-wide listener that counts every statement.
+"""
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Threshold used under TESTING when N_PLUS_ONE_THRESHOLD is not set
+TESTING_THRESHOLD = 10
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+def init_app(app):
+    if app.config['N_PLUS_ONE_THRESHOLD'] is None:
+        app.config['N_PLUS_ONE_THRESHOLD'] = TESTING_THRESHOLD if app.testing else 0
+    if not app.config['N_PLUS_ONE_THRESHOLD']:
+        return
+    _listen_to_engines()
+    app.before_request(_start_request)
+    app.after_request(_check_request)
+
+
+def exempt():
+    """Stop checking the current request, e.g. for deliberately batched work."""
+    g.pop('_statement_shapes', None)
+
+
+def _start_request():
+    g._statement_shapes = Counter()
+
+
+def _check_request(response):
+    shapes = g.pop('_statement_shapes', None)
+    if not shapes:
+        return response
+    statement, count = shapes.most_common(1)[0]
+    if count > current_app.config['N_PLUS_ONE_THRESHOLD']:
+        message = (f'{request.method} {request.path} ran the same statement {count} times '
+                   f'(possible N+1): {statement}')
+        if current_app.testing:
+            raise NPlusOneError(message)
+        current_app.logger.warning(message)
+    return response
+
+
+_listening = False
+
+
+def _listen_to_engines():
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_statement_shapes' in g:
+        g._statement_shapes[' '.join(statement.split())] += 1
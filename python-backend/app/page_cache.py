@@ -0,0 +1,87 @@
+"""Rendered-HTML cache for the static marketing pages.
+
+Decorated views render once per process and key; anonymous GET/HEAD
+requests are then answered from memory with a strong ETag, a long-lived
+``Cache-Control`` and, when the client accepts it, a gzip variant compressed
+at store time.  The key covers the endpoint, its view arguments, the host
+and any pending flashed messages (which are consumed on a hit exactly as
+rendering would).  Pages carrying flashes are one-off and are sent
+``no-store``.  Signed-in users always get a fresh render.
+
+``init_app`` also installs a Jinja bytecode cache so a freshly forked or
+restarted worker loads compiled templates instead of re-parsing them.
+"""
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_login import current_user
+from jinja2 import FileSystemBytecodeCache
+
+from app.cache import TTLCache
+
+
+class Page:
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+class PageCache:
+    def __init__(self):
+        self.pages = TTLCache()
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = app.config['PAGE_CACHE_ENABLED']
+        self.pages.configure(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+
+        directory = app.config['JINJA_BYTECODE_CACHE_DIR']
+        if directory:
+            directory = os.path.join(app.instance_path, directory)
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_options = {**app.jinja_options,
+                                 'bytecode_cache': FileSystemBytecodeCache(directory)}
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # In debug mode templates reload on change, so always render
+            if not self.enabled or current_app.debug or request.method not in ('GET', 'HEAD') \
+                    or request.args or current_user.is_authenticated:
+                return view(*args, **kwargs)
+
+            flashes = session.get('_flashes')
+            key = (request.endpoint, tuple(sorted(kwargs.items())), request.host,
+                   repr(flashes) if flashes else None)
+            page = self.pages.get(key)
+            if page is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                page = Page(response.get_data(), response.mimetype)
+                self.pages.set(key, page)
+            elif flashes:
+                # Rendering would have consumed them
+                session.pop('_flashes', None)
+            return self._respond(page, one_off=bool(flashes))
+        return wrapper
+
+    def _respond(self, page, one_off):
+        gzipped = request.accept_encodings['gzip'] > 0
+        response = current_app.response_class(page.gzipped if gzipped else page.body,
+                                              mimetype=page.mimetype)
+        if gzipped:
+            response.content_encoding = 'gzip'
+        response.vary.update(('Accept-Encoding', 'Cookie'))
+        if one_off:
+            response.cache_control.no_store = True
+            return response
+        response.set_etag(page.etag + ('-gz' if gzipped else ''))
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['PAGE_CACHE_MAX_AGE']
+        return response.make_conditional(request)
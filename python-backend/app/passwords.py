@@ -0,0 +1,120 @@
+"""Password hashing off the request threads.
+
+Key derivation is CPU bound and holds the GIL, so a burst of logins would
+otherwise stall every other request in the worker.  Hashes are computed in
+a small process pool instead; when the pool and its queue are full the
+caller gets :class:`HashingBusy` (a 503 with ``Retry-After``) rather than
+piling up blocked threads.
+
+Bulk imports share the pool at a lower priority.  They submit small chunks
+and wait for slots instead of failing.  All bulk work together keeps at most
+``workers - 1`` chunks in flight, so a login never queues behind more than one
+chunk.
+"""
+import os
+import threading
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# Passwords per bulk task; bounds how long a login can wait behind one
+BULK_CHUNK_SIZE = 8
+
+
+class HashingBusy(Exception):
+    """Raised when no hashing slot is free."""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = 'scrypt'
+        self.workers = 0
+        self.retry_after = 1
+        self._slots = None
+        self._bulk_slots = None
+        self._executor = None
+        self._executor_pid = None
+        self._method_prefix = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.retry_after = app.config['PASSWORD_HASH_RETRY_AFTER']
+        self._slots = threading.BoundedSemaphore(
+            max(self.workers, 1) + app.config['PASSWORD_HASH_QUEUE_SIZE'])
+        self._bulk_slots = threading.BoundedSemaphore(max(self.workers - 1, 1))
+        self._method_prefix = None
+        app.register_error_handler(HashingBusy, self._busy_response)
+
+    def hash(self, password):
+        return self._call(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._call(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords, method=None):
+        """Hash a batch in parallel across the pool (for bulk imports).
+
+        Blocks for free slots rather than raising :class:`HashingBusy`.
+        """
+        method = method or self.method
+        if not self.workers or len(passwords) < 2:
+            return _hash_all(passwords, method)
+        futures = []
+        for start in range(0, len(passwords), BULK_CHUNK_SIZE):
+            self._bulk_slots.acquire()
+            self._slots.acquire()
+            try:
+                future = self._pool().submit(_hash_all, passwords[start:start + BULK_CHUNK_SIZE], method)
+            except BaseException:
+                self._release_bulk()
+                raise
+            future.add_done_callback(self._release_bulk)
+            futures.append(future)
+        return [pwhash for future in futures for pwhash in future.result()]
+
+    def needs_rehash(self, pwhash):
+        """True when ``pwhash`` was made with a different method or cost."""
+        if self._method_prefix is None:
+            # werkzeug expands bare names ("scrypt") to their full parameters
+            self._method_prefix = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def _call(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self._pool().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _release_bulk(self, future=None):
+        self._slots.release()
+        self._bulk_slots.release()
+
+    def _busy_response(self, e):
+        response = jsonify({'error': 'Server is busy, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+    def _pool(self):
+        # Created lazily and per process, so pre-forked workers each get their own
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+
+
+def _hash_all(passwords, method):
+    return [generate_password_hash(password, method) for password in passwords]
@@ -0,0 +1,196 @@
+"""Token-bucket rate limits for the endpoints that are expensive to abuse.
+
+``RATE_LIMITS`` maps an endpoint to comma-separated ``<key>=<count>/<seconds>``
+rules, e.g. ``ip=30/60, username=10/300``.  The key is ``ip`` (the client
+address) or the name of a JSON or form field such as ``username``; requests
+without that field skip the rule.  Each rule allows bursts of ``count`` and
+refills at ``count / seconds`` per second.  Only unsafe methods are limited,
+and the check runs in ``before_request``, so a rejected request gets a 429
+with ``Retry-After`` before the view touches the database or the password
+hasher.
+
+Buckets live in this process by default: one dict per rule, kept in
+last-use order, so a check is O(1) and idle buckets (which would have
+refilled anyway) are evicted from the front as new ones arrive.  With
+``RATE_LIMIT_STORAGE_URL`` set to a ``redis://`` URL the buckets are kept
+in Redis instead (requires the optional ``redis`` package) and the limits
+hold across workers.  Behind a reverse proxy, ``ip`` is only meaningful if
+the proxy's address is replaced, e.g. with werkzeug's ``ProxyFix``.
+"""
+import logging
+import math
+import threading
+import time
+
+from flask import jsonify, request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Rule:
+    __slots__ = ('key', 'count', 'period', 'rate')
+
+    def __init__(self, key, count, period):
+        self.key = key
+        self.count = count
+        self.period = period
+        self.rate = count / period
+
+    def __repr__(self):
+        return f'{self.key}={self.count}/{self.period}'
+
+
+def parse_rules(spec):
+    """Parse ``"ip=30/60, username=10/300"`` into :class:`Rule` objects."""
+    rules = []
+    for part in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            key, limit = part.split('=')
+            count, period = limit.split('/')
+            rule = Rule(key.strip(), int(count), float(period))
+        except ValueError:
+            raise ValueError(f'Bad rate limit rule {part!r}, expected <key>=<count>/<seconds>')
+        if rule.count < 1 or rule.period <= 0:
+            raise ValueError(f'Bad rate limit rule {part!r}, count and period must be positive')
+        rules.append(rule)
+    return rules
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def take(self, table, rule, key, now):
+        """Take one token; returns 0 if allowed, else seconds until one is free."""
+        with self._lock:
+            buckets = self._tables.setdefault(table, {})
+            state = buckets.pop(key, None)
+            if state is None:
+                tokens = rule.count
+            else:
+                tokens = min(rule.count, state[0] + max(now - state[1], 0) * rule.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rule.rate
+            # Re-inserting keeps the dict in last-use order for eviction
+            buckets[key] = (tokens, now)
+            while buckets:
+                oldest = next(iter(buckets))
+                if now - buckets[oldest][1] < rule.period and len(buckets) <= self.max_keys:
+                    break
+                del buckets[oldest]
+            return wait
+
+    def size(self):
+        with self._lock:
+            return sum(len(buckets) for buckets in self._tables.values())
+
+
+# Same algorithm as MemoryBuckets.take, run atomically in Redis.  The wait is
+# returned as a string because Redis truncates Lua numbers to integers.
+TAKE_SCRIPT = """
+local count = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = count
+if state[1] then
+    tokens = math.min(count, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(count / rate))
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, table, rule, key, now):
+        try:
+            return float(self._take(keys=[f'{self.prefix}{table[0]}:{table[1]}:{key}'],
+                                    args=[rule.count, rule.rate, now]))
+        except Exception:
+            # Fail open: an unreachable Redis must not lock everyone out
+            logging.exception('Rate limit backend unavailable')
+            return 0
+
+    def size(self):
+        return None
+
+
+class RateLimiter:
+    def __init__(self):
+        self.enabled = False
+        self.rules = {}
+        self.backend = None
+        self.allowed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.rules = {endpoint: rules for endpoint, spec in app.config['RATE_LIMITS'].items()
+                      if (rules := parse_rules(spec))}
+        self.backend = MemoryBuckets(app.config['RATE_LIMIT_MAX_KEYS'])
+        url = app.config['RATE_LIMIT_STORAGE_URL']
+        if url:
+            try:
+                self.backend = RedisBuckets(url)
+            except ImportError:
+                logging.warning('redis is not installed, rate limits are per process')
+        app.before_request(self.check)
+
+    def check(self):
+        if not self.enabled or request.method in SAFE_METHODS:
+            return None
+        rules = self.rules.get(request.endpoint)
+        if not rules:
+            return None
+
+        now = time.time()
+        wait = 0
+        for index, rule in enumerate(rules):
+            key = self._key(rule)
+            if key is not None:
+                wait = max(wait, self.backend.take((request.endpoint, index), rule, key, now))
+        with self._lock:
+            if wait:
+                self.rejected += 1
+            else:
+                self.allowed += 1
+        if not wait:
+            return None
+        response = jsonify({'error': 'Too many requests, please retry later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(wait))
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'allowed': self.allowed, 'rejected': self.rejected, 'keys': self.backend.size()}
+
+    @staticmethod
+    def _key(rule):
+        if rule.key == 'ip':
+            return request.remote_addr or ''
+        data = request.get_json(silent=True) if request.is_json else request.form
+        value = data.get(rule.key) if hasattr(data, 'get') else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return value.strip().lower()
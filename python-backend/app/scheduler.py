@@ -0,0 +1,362 @@
+"""Scheduled publishing and overdue notices for content items.
+
+Pending deadlines live in a min-heap owned by one background thread that
+sleeps on a condition variable until the earliest entry is due, so an idle
+scheduler costs nothing however many items are queued.  Due entries are
+re-checked against the database and applied in batches: one conditional
+UPDATE per target status and one executemany for the ``ContentHistory``
+rows.
+
+* ``scheduled`` items move to the next workflow step when their deadline
+  arrives;
+* other unfinished items get an ``overdue`` history entry once per deadline.
+
+Only one process runs the scheduler.  Every process with
+``CONTENT_SCHEDULER_ENABLED`` starts a standby thread (gunicorn starts it as
+each worker boots) that blocks on an exclusive lock on
+``CONTENT_SCHEDULER_LOCK`` in the instance folder; the holder loads the
+heap, and when its process exits the kernel releases the lock and one of
+the others takes over.
+
+Changes the leader commits itself are pushed into the heap as they happen.
+Items changed by other processes are picked up every
+``CONTENT_SCHEDULER_POLL`` seconds by their ``updated_at``, and
+``CONTENT_SCHEDULER_RESYNC`` adds a periodic full reload for bulk SQL that
+bypasses it.  Both writes are conditional, so even two schedulers cannot
+publish an item twice or flag one deadline as overdue twice.
+"""
+import fcntl
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session, object_session
+
+from app import db, content
+from app.models import ContentItem, ContentHistory
+
+PUBLISH = 'publish'
+OVERDUE = 'overdue'
+# Seconds before a failed batch is retried through a full resync
+RETRY_DELAY = 60
+# Each poll re-reads items updated this long before the previous one, to
+# catch transactions that committed after it with an earlier updated_at
+POLL_OVERLAP = timedelta(seconds=10)
+
+
+class ContentScheduler:
+    def __init__(self):
+        self._app = None
+        self._cond = threading.Condition()
+        self._heap = []
+        self._due = {}  # item id -> (when, kind); heap entries not matching are stale
+        self._changes = []
+        self._polled = {}  # item id -> updated_at seen by the last poll
+        self._pid = None
+        self._leader = None
+        self._lock_file = None
+        self._stopping = False
+        self.fired = 0
+
+    def init_app(self, app):
+        if not app.config['CONTENT_SCHEDULER_ENABLED']:
+            return
+        self._app = app
+        # gunicorn starts it in post_worker_init; this covers other servers
+        app.before_request(self.start)
+
+    @property
+    def running(self):
+        """True in the process whose thread holds the lock and owns the heap."""
+        return self._leader == os.getpid()
+
+    def start(self):
+        """Start the standby thread; it runs the scheduler once elected."""
+        if self._app is None or self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # Anything inherited from a forking parent belongs to its thread
+            self._pid = os.getpid()
+            self._leader = None
+            self._heap, self._due, self._changes = [], {}, []
+            self._polled = {}
+            self._stopping = False
+            threading.Thread(target=self._run, name='content-scheduler', daemon=True).start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._pid = None
+            self._leader = None
+            self._cond.notify()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def stats(self):
+        with self._cond:
+            return {'pending': len(self._due), 'fired': self.fired, 'leader': self.running}
+
+    def update(self, items):
+        """Queue ``(id, status, deadline, content_type)`` tuples for re-planning.
+
+        A ``status`` of None cancels the item.  Planning happens on the
+        scheduler thread, so callers (commit hooks) never touch the database.
+        """
+        with self._cond:
+            self._changes.extend(items)
+            self._cond.notify()
+
+    def poll(self, since):
+        """Re-plan items updated at or after ``since`` (by any process)."""
+        rows = db.session.execute(
+            db.select(ContentItem.id, ContentItem.status, ContentItem.deadline,
+                      ContentItem.content_type, ContentItem.updated_at)
+            .where(ContentItem.updated_at >= since)).all()
+        db.session.rollback()
+        # The overlap re-reads the previous poll's rows; only re-plan real changes
+        polled = {row.id: row.updated_at for row in rows}
+        changes = [tuple(row)[:4] for row in rows if self._polled.get(row.id) != row.updated_at]
+        self._polled = polled
+        if changes:
+            self._apply(changes)
+
+    def resync(self):
+        """Reload every pending deadline from the database."""
+        flagged = (db.select(ContentHistory.id)
+                   .where(ContentHistory.content_id == ContentItem.id,
+                          ContentHistory.status == OVERDUE,
+                          ContentHistory.created_at >= ContentItem.deadline)
+                   .exists())
+        rows = db.session.execute(
+            db.select(ContentItem.id, ContentItem.status, ContentItem.deadline, ContentItem.content_type)
+            .where(ContentItem.deadline.is_not(None), ~flagged)
+            .execution_options(yield_per=5000))
+        due = {}
+        for row in rows:
+            plan = _plan(row.status, row.deadline, row.content_type)
+            if plan is not None:
+                due[row.id] = plan
+        db.session.rollback()
+        with self._cond:
+            self._due = due
+            self._rebuild()
+            self._cond.notify()
+
+    def _apply(self, changes):
+        plans = [(item[0], _plan(*item[1:])) for item in changes]
+        with self._cond:
+            for item_id, plan in plans:
+                if plan is None:
+                    self._due.pop(item_id, None)
+                    continue
+                self._due[item_id] = plan
+                heapq.heappush(self._heap, (plan[0], item_id, plan[1]))
+            if len(self._heap) > 2 * len(self._due) + 1024:
+                self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(when, item_id, kind) for item_id, (when, kind) in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def _elect(self):
+        path = os.path.join(self._app.instance_path, self._app.config['CONTENT_SCHEDULER_LOCK'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(path, 'a')
+        # Blocks until no other process holds it; released when this one exits
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with self._cond:
+            if self._stopping or self._pid != os.getpid():
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            self._leader = os.getpid()
+        self._app.logger.info('Content scheduler running in process %d', os.getpid())
+        return True
+
+    def _run(self):
+        if not self._elect():
+            return
+        config = self._app.config
+        interval = config['CONTENT_SCHEDULER_RESYNC']
+        poll_interval = config['CONTENT_SCHEDULER_POLL']
+        polled = _utcnow()
+        with self._app.app_context():
+            self.resync()
+        next_resync = time.monotonic() + interval if interval else None
+        next_poll = time.monotonic() + poll_interval if poll_interval else None
+
+        while True:
+            with self._cond:
+                while not self._stopping and not self._changes:
+                    timeout = self._timeout(next_resync, next_poll)
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+                changes, self._changes = self._changes, []
+                due = self._pop_due(config['CONTENT_SCHEDULER_BATCH_SIZE'])
+
+            with self._app.app_context():
+                try:
+                    if changes:
+                        self._apply(changes)
+                    if next_poll is not None and time.monotonic() >= next_poll:
+                        started = _utcnow()
+                        self.poll(polled - POLL_OVERLAP)
+                        polled = started
+                        next_poll = time.monotonic() + poll_interval
+                    if due:
+                        self._fire(due)
+                    if next_resync is not None and time.monotonic() >= next_resync:
+                        self.resync()
+                        next_resync = time.monotonic() + interval if interval else None
+                except Exception:
+                    db.session.rollback()
+                    self._app.logger.exception('Content scheduler batch failed')
+                    # The resync reloads whatever the failed batch left pending
+                    next_resync = time.monotonic() + RETRY_DELAY
+
+    def _timeout(self, *deadlines):
+        timeouts = [deadline - time.monotonic() for deadline in deadlines if deadline is not None]
+        if self._heap:
+            timeouts.append((self._heap[0][0] - _utcnow()).total_seconds())
+        return min(timeouts) if timeouts else None
+
+    def _pop_due(self, limit):
+        now = _utcnow()
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            when, item_id, kind = heapq.heappop(self._heap)
+            if self._due.get(item_id) == (when, kind):
+                del self._due[item_id]
+                due.append((item_id, kind))
+        return due
+
+    def _fire(self, due):
+        kinds = dict(due)
+        now = _utcnow()
+        rows = db.session.execute(
+            db.select(ContentItem.id, ContentItem.status, ContentItem.deadline,
+                      ContentItem.content_type, ContentItem.created_by)
+            .where(ContentItem.id.in_(kinds))).all()
+
+        publish = {}
+        history = []
+        overdue = []
+        for row in rows:
+            plan = _plan(row.status, row.deadline, row.content_type)
+            if plan is None or plan[1] != kinds[row.id]:
+                continue
+            if plan[0] > now:
+                # The deadline moved in another process; queue the new one
+                self.update([(row.id, row.status, row.deadline, row.content_type)])
+            elif plan[1] == PUBLISH:
+                publish.setdefault(_next_step(row.content_type), []).append(row)
+            else:
+                overdue.append({'content_id': row.id, 'status': OVERDUE, 'created_by': row.created_by,
+                                'notes': f'Deadline {row.deadline.isoformat()} passed while {row.status}',
+                                'created_at': now})
+
+        for target, targets in publish.items():
+            owners = {row.id: row.created_by for row in targets}
+            published = db.session.scalars(
+                db.update(ContentItem)
+                .where(ContentItem.id.in_(owners), ContentItem.status == 'scheduled')
+                .values(status=target, updated_at=now)
+                .returning(ContentItem.id)).all()
+            history += [{'content_id': item_id, 'status': target, 'created_by': owners[item_id],
+                         'notes': 'Published on schedule', 'created_at': now}
+                        for item_id in published]
+        fired = len(history)
+        if history:
+            db.session.execute(db.insert(ContentHistory), history)
+        if overdue:
+            result = db.session.execute(_OVERDUE_INSERT, overdue)
+            fired += max(result.rowcount, 0)
+        db.session.commit()
+        with self._cond:
+            self.fired += fired
+
+
+def _overdue_insert():
+    # INSERT ... SELECT ... WHERE NOT EXISTS: flag a deadline only if no
+    # overdue entry for it exists yet, checked by the insert itself
+    history = ContentHistory.__table__
+    item = ContentItem.__table__
+    flagged = (db.select(history.c.id)
+               .join(item, item.c.id == history.c.content_id)
+               .where(history.c.content_id == bindparam('content_id'),
+                      history.c.status == OVERDUE,
+                      history.c.created_at >= item.c.deadline)
+               .exists())
+    columns = ('content_id', 'status', 'created_by', 'notes', 'created_at')
+    return history.insert().from_select(
+        columns, db.select(*(bindparam(name) for name in columns)).where(~flagged))
+
+
+_OVERDUE_INSERT = _overdue_insert()
+
+
+def _plan(status, deadline, content_type):
+    """Return ``(when, kind)`` for an item, or None if nothing is pending."""
+    if status is None or deadline is None:
+        return None
+    if deadline.tzinfo is not None:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    if status == 'scheduled':
+        return (deadline, PUBLISH) if _next_step(content_type) else None
+    steps = content.workflow_for(content_type).steps
+    if status == steps[-1]:
+        return None
+    return deadline, OVERDUE
+
+
+def _next_step(content_type):
+    steps = content.workflow_for(content_type).steps
+    if 'scheduled' not in steps or steps[-1] == 'scheduled':
+        return None
+    return steps[steps.index('scheduled') + 1]
+
+
+def _utcnow():
+    # Deadlines are stored as naive UTC, like every other timestamp column
+    return datetime.utcnow()
+
+
+@event.listens_for(ContentItem, 'after_insert')
+@event.listens_for(ContentItem, 'after_update')
+def _item_changed(mapper, connection, target):
+    _remember(target, (target.id, target.status, target.deadline, target.content_type))
+
+
+@event.listens_for(ContentItem, 'after_delete')
+def _item_deleted(mapper, connection, target):
+    _remember(target, (target.id, None, None, None))
+
+
+def _remember(target, item):
+    session = object_session(target)
+    if session is not None and scheduler.running:
+        session.info.setdefault('scheduled_items', {})[item[0]] = item
+
+
+@event.listens_for(Session, 'after_commit')
+def _reschedule_committed(session):
+    items = session.info.pop('scheduled_items', None)
+    if items:
+        scheduler.update(list(items.values()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_uncommitted(session):
+    session.info.pop('scheduled_items', None)
+
+
+scheduler = ContentScheduler()
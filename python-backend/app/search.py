@@ -0,0 +1,134 @@
+"""Full-text search over documents and announcements.
+
+SQLite uses FTS5 external-content tables kept in sync by triggers; PostgreSQL
+uses a generated ``tsvector`` column with a GIN index.  Either way the index
+is maintained by the database on every insert, update and delete, including
+bulk imports that bypass the ORM.
+
+The index is schema, created by the ``9b2f6d4e1c37`` migration; requests
+never run DDL.  Databases made with ``db.create_all()`` (development,
+benchmarks) create it with ``flask search-reindex`` instead.
+"""
+from sqlalchemy import text
+
+from app import db
+
+# table -> (title column, body column, API type name)
+SOURCES = {
+    'document': ('title', 'description', 'document'),
+    'announcement': ('title', 'content', 'announcement'),
+}
+
+
+def ensure_index(rebuild=False):
+    """Create the search index if it is missing (for ``create_all`` databases)."""
+    with db.engine.begin() as connection:
+        if db.engine.dialect.name == 'postgresql':
+            _ensure_postgres(connection)
+        else:
+            _ensure_sqlite(connection, rebuild)
+
+
+def index_exists():
+    if db.engine.dialect.name == 'postgresql':
+        stmt = text("SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'document' AND column_name = 'search_vector'")
+    else:
+        stmt = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_fts'")
+    return db.session.execute(stmt).first() is not None
+
+
+def search(query, types=None, limit=20, offset=0):
+    """Return ranked hits (best first) with highlighted snippets."""
+    types = [name for name in SOURCES if types is None or SOURCES[name][2] in types]
+    if not types or not query.strip():
+        return []
+    if db.engine.dialect.name == 'postgresql':
+        stmt, params = _postgres_query(types), {'q': query}
+    else:
+        match = _fts5_match(query)
+        if not match:
+            return []
+        stmt, params = _sqlite_query(types), {'q': match}
+    params.update(limit=limit, offset=offset)
+    rows = db.session.execute(text(stmt).columns(created_at=db.DateTime), params)
+    return [{
+        'type': row.type,
+        'id': row.id,
+        'title': row.title,
+        'snippet': row.snippet,
+        'rank': float(row.score),
+        'createdAt': row.created_at.isoformat() if row.created_at else None,
+    } for row in rows]
+
+
+def _ensure_sqlite(connection, rebuild):
+    for table, (title, body, _) in SOURCES.items():
+        fts = f'{table}_fts'
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': fts}).first()
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{title}, {body}, content='{table}', content_rowid='id')")
+        new_row = f'INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});'
+        old_row = (f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) "
+                   f"VALUES ('delete', old.id, old.{title}, old.{body});")
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {new_row} END')
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {old_row} END')
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} '
+            f'BEGIN {old_row} {new_row} END')
+        if rebuild or not exists:
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _ensure_postgres(connection):
+    for table, (title, body, _) in SOURCES.items():
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce({body}, '')), 'B')) STORED")
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_search_vector '
+            f'ON {table} USING GIN (search_vector)')
+
+
+def _sqlite_query(types):
+    # bm25() is lower-is-better, so negate it to match ts_rank's ordering
+    parts = [
+        f"SELECT '{SOURCES[table][2]}' AS type, t.id AS id, t.title AS title, "
+        f"snippet({table}_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet, "
+        f"-bm25({table}_fts, 10.0, 1.0) AS score, t.created_at AS created_at "
+        f"FROM {table}_fts JOIN {table} t ON t.id = {table}_fts.rowid "
+        f"WHERE {table}_fts MATCH :q"
+        for table in types
+    ]
+    return ' UNION ALL '.join(parts) + ' ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset'
+
+
+def _postgres_query(types):
+    parts = [
+        f"SELECT '{SOURCES[table][2]}' AS type, t.id AS id, t.title AS title, "
+        f"ts_headline('english', coalesce(t.{SOURCES[table][1]}, t.title), q, "
+        f"'StartSel=<mark>, StopSel=</mark>, MaxFragments=1, MaxWords=16, MinWords=4') AS snippet, "
+        f"ts_rank(t.search_vector, q) AS score, t.created_at AS created_at "
+        f"FROM {table} t, websearch_to_tsquery('english', :q) q "
+        f"WHERE t.search_vector @@ q"
+        for table in types
+    ]
+    return ' UNION ALL '.join(parts) + ' ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset'
+
+
+def _fts5_match(query):
+    """Turn free text into a safe FTS5 expression: all terms, last one as a prefix."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
@@ -0,0 +1,91 @@
+"""Production profile for file-backed SQLite deployments.
+
+With ``SQLITE_PRODUCTION`` enabled every connection runs in WAL mode with
+tuned pragmas, and the app gets two engines on the same file:
+
+* the default engine, limited to a single connection, serialises all writes
+  inside the process so writers never fight over the lock;
+* a ``sqlite_reader`` bind with a pool of read-only connections that keeps
+  serving reads while a write transaction is open.
+
+:class:`RoutingSession` sends plain SELECTs to the reader pool and switches a
+session to the writer as soon as it flushes or executes DML, keeping it
+there until the transaction ends so it always reads its own writes.
+"""
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+READER_BIND = 'sqlite_reader'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get('writer'):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                if not self._flushing and isinstance(clause, Select):
+                    return reader
+                self.info['writer'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _release_writer(session):
+    session.info.pop('writer', None)
+
+
+def configure(app):
+    """Adjust engine config before ``db.init_app`` when the profile applies."""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not app.config['SQLITE_PRODUCTION'] or not _is_sqlite_file(uri):
+        return False
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.update(pool_size=1, max_overflow=0,
+                   pool_timeout=app.config['SQLITE_WRITER_TIMEOUT'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[READER_BIND] = {
+        'url': uri,
+        'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+        'max_overflow': 0,
+    }
+    app.config['SQLALCHEMY_BINDS'] = binds
+    return True
+
+
+def install_pragmas(app, db):
+    """Apply the pragmas to every new connection of both engines."""
+    with app.app_context():
+        _listen(db.engines[None], app.config, read_only=False)
+        _listen(db.engines[READER_BIND], app.config, read_only=True)
+
+
+def _listen(engine, config, read_only):
+    statements = [
+        'PRAGMA journal_mode=WAL',
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT']}",
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA cache_size={config['SQLITE_CACHE_SIZE']}",
+    ]
+    if read_only:
+        statements.append('PRAGMA query_only=ON')
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def _is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
@@ -0,0 +1,119 @@
+"""Content-addressed file store for document bodies.
+
+Blobs are named by their SHA-256 and fanned out as ``ab/cd/abcd…`` under
+``DOCUMENT_STORAGE_PATH`` (relative paths resolve against the instance
+folder, like the SQLite database).  Uploads are streamed chunk by chunk into
+a temporary file while being hashed, then renamed into place, so memory use
+is constant whatever the file size and identical uploads share one blob.
+
+Because blobs are shared, requests never delete them: an upload may be
+about to commit a reference to the very blob another request sees as
+unused.  :meth:`ContentStore.sweep` (``flask documents-gc``) removes blobs
+that no document references and that nothing has written or reused for a
+grace period.  Reusing a blob refreshes its mtime, and the sweep's
+check-and-unlink shares a file lock with that step, so a blob is never
+removed between an upload finding it and the upload returning.
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class ContentStore:
+    def __init__(self):
+        self.root = None
+        self.chunk_size = 1024 * 1024
+
+    def init_app(self, app):
+        self.root = os.path.join(app.instance_path, app.config['DOCUMENT_STORAGE_PATH'])
+        self.chunk_size = app.config['DOCUMENT_CHUNK_SIZE']
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def save(self, stream, max_size=None):
+        """Copy ``stream`` into the store; returns ``(sha256 hex digest, size)``."""
+        incoming = os.path.join(self.root, 'incoming')
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise UploadTooLarge(f'Upload exceeds {max_size} bytes')
+                    digest.update(chunk)
+                    temp.write(chunk)
+                temp.flush()
+                os.fsync(temp.fileno())
+
+            key = digest.hexdigest()
+            target = self.path(key)
+            with self._lock(fcntl.LOCK_SH):
+                try:
+                    # Restart the blob's grace period so a sweep leaves it for us
+                    os.utime(target)
+                except FileNotFoundError:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(temp_path, target)
+                else:
+                    os.unlink(temp_path)
+            return key, size
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def sweep(self, referenced, grace):
+        """Delete blobs not in ``referenced`` and untouched for ``grace`` seconds.
+
+        ``referenced`` must be read from the database before the sweep starts;
+        anything committed later was written or reused within the grace
+        period.  Returns the number of files removed.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - grace
+        removed = 0
+        with self._lock(fcntl.LOCK_EX):
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if name in referenced or path == self._lock_path():
+                        continue
+                    # Includes temp files left in incoming/ by killed uploads
+                    try:
+                        if os.stat(path).st_mtime < cutoff:
+                            os.unlink(path)
+                            removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+    @contextmanager
+    def _lock(self, operation):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._lock_path(), 'a') as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _lock_path(self):
+        return os.path.join(self.root, '.lock')
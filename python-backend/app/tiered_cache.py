@@ -0,0 +1,323 @@
+"""Two-tier cache for read-mostly query results, invalidated by table tags.
+
+Every entry is stored in a size-bounded in-process LRU (:class:`TTLCache`)
+and, when ``CACHE_STORAGE_URL`` is set, in a shared tier speaking the Redis
+``GET``/``SET``/``MGET``/``INCR`` protocol: a ``redis://`` URL (requires the
+optional ``redis`` package) shares entries between workers, ``memory://``
+uses :class:`MemoryStore`, an in-process stand-in for tests and single
+worker setups.
+
+Entries carry tags, normally the names of the tables they were read from.
+Each tag has a version counter; an entry is only served while the versions
+it was stored under are current, so invalidating a tag is one counter bump
+however many keys it covers.  Committed ORM writes, including bulk
+``insert()``/``update()``/``delete()`` statements run through the session,
+invalidate their tables' tags automatically.  Versions live in the shared
+tier when there is one (one ``MGET`` per lookup), so a write in one worker
+invalidates every worker's entries.  Without it they are per process and
+other workers' entries age out after ``CACHE_LOCAL_TTL`` seconds, which is
+why ``CACHE_ENABLED`` defaults to off unless ``CACHE_STORAGE_URL`` is set.
+Shared entries are stored as JSON, so cached values must be JSON
+serialisable (lists come back in place of tuples).
+
+Concurrent misses on one key are coalesced: the first request runs the
+loader and the others wait for its result instead of repeating the query.
+"""
+import json
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.cache import TTLCache
+
+_MISSING = object()
+
+
+class MemoryStore:
+    """In-process stand-in for the subset of the Redis client used here."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def mget(self, names):
+        return [self.get(name) for name in names]
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (value, None if ex is None else time.monotonic() + ex)
+        return True
+
+    def incr(self, name):
+        with self._lock:
+            value, expires = self._data.get(name, (b'0', None))
+            value = str(int(value) + 1).encode()
+            self._data[name] = (value, expires)
+            return int(value)
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache:
+    def __init__(self):
+        self.enabled = False
+        self.local = TTLCache()
+        self.shared = None
+        self.prefix = ''
+        self.shared_ttl = None
+        self._versions = {}  # tag -> version, when there is no shared tier
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['CACHE_ENABLED']
+        self.local.configure(app.config['CACHE_LOCAL_SIZE'], app.config['CACHE_LOCAL_TTL'])
+        self.prefix = app.config['CACHE_KEY_PREFIX']
+        self.shared_ttl = app.config['CACHE_SHARED_TTL']
+        self.shared = None
+        url = app.config['CACHE_STORAGE_URL']
+        if url.startswith('memory://'):
+            self.shared = MemoryStore()
+        elif url:
+            try:
+                import redis
+            except ImportError:
+                logging.warning('redis is not installed, the cache is per process')
+            else:
+                self.shared = redis.Redis.from_url(url)
+        if not event.contains(Session, 'after_flush', _collect_flushed):
+            event.listen(Session, 'after_flush', _collect_flushed)
+            event.listen(Session, 'do_orm_execute', _collect_executed)
+            event.listen(Session, 'after_commit', self._invalidate_committed)
+            event.listen(Session, 'after_rollback', _forget_uncommitted)
+
+    def get_or_set(self, key, loader, tags=()):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss.
+
+        The value must be JSON serialisable to reach the shared tier.
+        """
+        if not self.enabled:
+            return loader()
+        tags = tuple(sorted(tags))
+        # Read the versions before loading, so a write that lands while the
+        # loader runs leaves the entry already stale
+        versions = self._tag_versions(tags)
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == versions:
+            with self._lock:
+                self.local_hits += 1
+            return entry[1]
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if isinstance(flight.value, Uncacheable):
+                # Not shareable (e.g. an error response); load our own
+                return loader()
+            return flight.value
+
+        try:
+            value = self._shared_get(key, versions)
+            if value is _MISSING:
+                with self._lock:
+                    self.misses += 1
+                value = loader()
+                if not isinstance(value, Uncacheable):
+                    self._shared_set(key, versions, value)
+                    self.local.set(key, (versions, value))
+            else:
+                self.local.set(key, (versions, value))
+            flight.value = value
+            return value
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def cached(self, *models):
+        """Decorate a GET view so its JSON response is cached per request URL.
+
+        Tagged with the models' tables.  Inside :func:`conditional` the key
+        also carries the table versions, so the body always matches the ETag.
+        """
+        tags = tuple(model.__table__.name for model in models)
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                def render():
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return Uncacheable(response)
+                    # Text rather than bytes so the shared tier can store it as JSON
+                    return (response.get_data(as_text=True), response.mimetype,
+                            response.headers.get('X-Next-Cursor'))
+
+                key = ('view', request.endpoint, request.full_path, g.get('table_versions'))
+                cached = self.get_or_set(key, render, tags)
+                if isinstance(cached, Uncacheable):
+                    return cached.response
+                body, mimetype, cursor = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                if cursor:
+                    response.headers['X-Next-Cursor'] = cursor
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """Make every entry stored under any of ``tags`` stale."""
+        if not tags:
+            return
+        with self._lock:
+            self.invalidations += len(tags)
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+        if self.shared is not None:
+            try:
+                for tag in tags:
+                    self.shared.incr(self._tag_key(tag))
+            except Exception:
+                self._shared_failed('invalidate')
+
+    def stats(self):
+        local = self.local.stats()
+        with self._lock:
+            stats = {
+                'size': local['size'],
+                'maxsize': local['maxsize'],
+                'evictions': local['evictions'],
+                'hits': self.local_hits + self.shared_hits,
+                'localHits': self.local_hits,
+                'sharedHits': self.shared_hits,
+                # Lookups that ran the loader; coalesced waiters are not counted
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'invalidations': self.invalidations,
+                'errors': self.errors,
+                'shared': type(self.shared).__name__ if self.shared is not None else None,
+            }
+        lookups = stats['hits'] + stats['misses']
+        stats['hitRatio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _tag_versions(self, tags):
+        if self.shared is not None and tags:
+            try:
+                return tuple(int(value or 0) for value in
+                             self.shared.mget([self._tag_key(tag) for tag in tags]))
+            except Exception:
+                self._shared_failed('read tag versions')
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def _shared_get(self, key, versions):
+        if self.shared is None:
+            return _MISSING
+        try:
+            raw = self.shared.get(self._entry_key(key))
+        except Exception:
+            self._shared_failed('get')
+            return _MISSING
+        if raw is None:
+            return _MISSING
+        try:
+            stored_versions, value = json.loads(raw)
+        except ValueError:
+            # Not ours (e.g. written by an older release); load it afresh
+            return _MISSING
+        if tuple(stored_versions) != versions:
+            return _MISSING
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def _shared_set(self, key, versions, value):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(self._entry_key(key), json.dumps([versions, value]), ex=self.shared_ttl)
+        except Exception:
+            self._shared_failed('set')
+
+    def _shared_failed(self, operation):
+        # Fail open: without the shared tier every request just loads from the database
+        with self._lock:
+            self.errors += 1
+        logging.exception('Shared cache %s failed', operation)
+
+    def _entry_key(self, key):
+        return f'{self.prefix}{key!r}'
+
+    def _tag_key(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def _invalidate_committed(self, session):
+        tags = session.info.pop('cache_tags', None)
+        if tags:
+            self.invalidate(*sorted(tags))
+
+
+class Uncacheable:
+    """Loader result to hand back without storing (an error response, a stream)."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def _collect_flushed(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    for instances in (session.new, session.dirty, session.deleted):
+        tags.update(instance.__table__.name for instance in instances
+                    if hasattr(instance, '__table__'))
+
+
+def _collect_executed(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, 'table', None)
+        if table is not None:
+            state.session.info.setdefault('cache_tags', set()).add(table.name)
+
+
+def _forget_uncommitted(session):
+    session.info.pop('cache_tags', None)
@@ -0,0 +1,94 @@
+"""Startup budget check for CI: import time, lazy modules and DB connections.
+
+Run from python-backend/:
+
+    python benchmarks/import_budget.py --budget-ms 700
+
+Imports ``main`` (which builds the app) in fresh interpreters under
+``python -X importtime`` and exits with status 1 when
+
+* the best of ``--runs`` cumulative import times exceeds the budget,
+* a module that should load lazily (migration tooling, DB drivers, CLI-only
+  helpers) was imported, or
+* a database connection was opened during startup.
+
+On failure the modules with the largest self time are listed to point at
+the regression.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = ('alembic', 'flask_migrate', 'psycopg2', 'numpy', 'redis', 'prometheus_client', 'app.audit', 'app.scheduler')
+
+PROBE = f"""
+import json, sqlite3, sys
+sys.path.insert(0, '.')
+connections = []
+_connect = sqlite3.connect
+def connect(*args, **kwargs):
+    connections.append(args[0] if args else kwargs.get('database'))
+    return _connect(*args, **kwargs)
+sqlite3.connect = connect
+import main
+print(json.dumps({{'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules],
+                  'connections': len(connections)}}))
+"""
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure():
+    env = dict(os.environ)
+    env.pop('CONTENT_SCHEDULER_ENABLED', None)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    modules = []
+    total = None
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((int(own), name))
+            if name == 'main' and len(indent) == 1:
+                total = int(cumulative)
+    return total / 1000, modules, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('IMPORT_BUDGET_MS', 700)))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    best, modules, probe = min(runs, key=lambda run: run[0])
+    print(f'startup import time: {best:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)')
+
+    failures = []
+    if best > args.budget_ms:
+        failures.append(f'import time {best:.1f} ms exceeds the {args.budget_ms:.0f} ms budget')
+    if probe['loaded']:
+        failures.append('imported at startup but should be lazy: ' + ', '.join(probe['loaded']))
+    if probe['connections']:
+        failures.append(f"{probe['connections']} database connection(s) opened during startup")
+
+    if failures:
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        print('\nlargest self times:')
+        for own, name in sorted(modules, reverse=True)[:args.top]:
+            print(f'  {own / 1000:8.1f} ms  {name}')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""Per-route latency, throughput, SQL count and memory for every blueprint route.
+
+Run from python-backend/:
+
+    python benchmarks/route_suite.py --size 100k --output before.json
+    python benchmarks/route_suite.py --size 100k --output after.json --compare before.json
+    python benchmarks/route_suite.py --compare before.json after.json
+
+A temporary SQLite database is seeded with ``--size`` rows each of
+documents, announcements and content items (plus one user per hundred rows
+and the demo financial data); pass ``--db`` to keep it and skip seeding next
+time, which matters at 1m.  Every route in the URL map is then driven in
+process through the Flask test client, signed in as an admin unless the page
+is public:
+
+* ``--requests`` sequential requests give the p50/p95/p99 latencies;
+* the same number spread over ``--threads`` client threads gives req/s;
+* the SQL count comes from the ``Server-Timing`` header and the peak RSS
+  is sampled from /proc while the route runs.
+
+Routes that cannot be repeated (deletes, logout) are listed as skipped.
+Write routes really write, so a reused database grows between runs.
+Results are saved as JSON; ``--compare`` prints the change per route
+against a saved baseline.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append('.')
+from config import Config
+from app import create_app, db
+from app.models import Announcement, ContentItem, Document, User
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+SEED_BATCH = 50_000
+PASSWORD = 'bench-password'
+
+# endpoint -> reason; everything else in the URL map must be covered by CASES
+SKIP = {
+    'static': 'static files are served by the web server',
+    'auth.logout': 'ends the benchmark session',
+    'api.delete_document': 'destructive',
+    'api.delete_announcement': 'destructive',
+    'api.delete_content_item': 'destructive',
+}
+
+SQL_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+def _csv_documents(n):
+    rows = ''.join(f'Imported {n}-{i},{n}-{i}.pdf,application/pdf\n' for i in range(100))
+    return 'title,fileName,mimeType\n' + rows
+
+
+def _new_user(n):
+    return {'username': f'bench-{os.getpid()}-{n}', 'password': PASSWORD, 'fullName': 'Bench User',
+            'email': 'bench@example.com', 'department': 'QA', 'title': 'Benchmark'}
+
+
+# (name, endpoint, method, path, request kwargs).  Paths and bodies may be
+# callables taking the request number, for routes that need varied input.
+CASES = [
+    ('GET /', 'main.index', 'GET', '/', {'anonymous': True}),
+    ('GET /about', 'main.about', 'GET', '/about', {'anonymous': True}),
+    ('GET /services', 'main.services', 'GET', '/services', {'anonymous': True}),
+    ('GET /team', 'main.team', 'GET', '/team', {'anonymous': True}),
+    ('GET /careers', 'main.careers', 'GET', '/careers', {'anonymous': True}),
+    ('GET /financials', 'main.financials', 'GET', '/financials', {'anonymous': True}),
+    ('GET /contact', 'main.contact', 'GET', '/contact', {'anonymous': True}),
+    ('POST /contact', 'main.contact', 'POST', '/contact', {'anonymous': True, 'data': {
+        'name': 'Bench', 'email': 'bench@example.com', 'subject': 'Benchmark', 'message': 'Hello'}}),
+    ('GET /admin/init-financial-data', 'main.init_financial_data', 'GET', '/admin/init-financial-data', {}),
+    ('GET /metrics', 'metrics', 'GET', '/metrics', {}),
+    ('POST /api/login', 'auth.login', 'POST', '/api/login', {
+        'anonymous': True, 'json': {'username': 'bench', 'password': PASSWORD}}),
+    ('POST /api/register', 'auth.register', 'POST', '/api/register', {
+        'anonymous': True, 'json': _new_user}),
+    ('GET /api/user', 'auth.get_user', 'GET', '/api/user', {}),
+    ('GET /api/employees', 'api.get_employees', 'GET', '/api/employees?limit=100', {}),
+    ('GET /api/employees/search', 'api.search_employees', 'GET', '/api/employees/search?q=user', {}),
+    ('GET /api/employees/search?q=<prefix>', 'api.search_employees', 'GET',
+     lambda n: f'/api/employees/search?q=user{n % 1000}', {}),
+    ('POST /api/employees/import', 'api.import_employees', 'POST', '/api/employees/import', {
+        'content_type': 'application/x-ndjson', 'data': lambda n: json.dumps(_new_user(n)) + '\n'}),
+    ('GET /api/documents', 'api.get_documents', 'GET', '/api/documents?limit=100', {}),
+    ('GET /api/documents?expand=author', 'api.get_documents', 'GET',
+     '/api/documents?limit=100&expand=author', {}),
+    ('POST /api/documents', 'api.create_document', 'POST', '/api/documents', {'json': {
+        'title': 'Bench', 'description': 'benchmark', 'fileName': 'bench.pdf',
+        'mimeType': 'application/pdf'}}),
+    ('POST /api/documents/import', 'api.import_documents', 'POST', '/api/documents/import', {
+        'content_type': 'text/csv', 'data': _csv_documents}),
+    ('PUT /api/documents/<id>/content', 'api.upload_document_content', 'PUT',
+     '/api/documents/2/content', {'content_type': 'application/pdf', 'data': lambda n: os.urandom(64 * 1024)}),
+    ('GET /api/documents/<id>/content', 'api.download_document_content', 'GET',
+     '/api/documents/1/content', {}),
+    ('GET /api/announcements', 'api.get_announcements', 'GET', '/api/announcements?limit=100', {}),
+    ('GET /api/announcements?expand=author', 'api.get_announcements', 'GET',
+     '/api/announcements?limit=100&expand=author', {}),
+    ('POST /api/announcements', 'api.create_announcement', 'POST', '/api/announcements', {'json': {
+        'title': 'Bench', 'content': 'benchmark announcement', 'isImportant': False}}),
+    ('GET /api/search', 'api.search_content', 'GET', '/api/search?q=quarterly', {}),
+    ('GET /api/financials/metrics', 'api.get_financial_metrics', 'GET', '/api/financials/metrics', {}),
+    ('POST /api/financials/metrics', 'api.create_financial_metric', 'POST', '/api/financials/metrics', {
+        'json': {'name': 'Bench', 'value': 1.0, 'description': 'benchmark', 'icon': 'bi-graph-up'}}),
+    ('GET /api/financials/revenue-breakdown', 'api.get_revenue_breakdown', 'GET',
+     '/api/financials/revenue-breakdown', {}),
+    ('GET /api/financials/revenue-breakdown?pivot', 'api.get_revenue_breakdown', 'GET',
+     '/api/financials/revenue-breakdown?pivot=1', {}),
+    ('GET /api/financials/yearly', 'api.get_yearly_financials', 'GET', '/api/financials/yearly', {}),
+    ('GET /api/financials/investor-events', 'api.get_investor_events', 'GET',
+     '/api/financials/investor-events', {}),
+    ('GET /api/financials/analytics', 'api.get_financial_analytics', 'GET',
+     '/api/financials/analytics?metrics=revenue,growth,margin,revenueRolling,segments', {}),
+    ('GET /api/admin/cache-stats', 'api.get_cache_stats', 'GET', '/api/admin/cache-stats', {}),
+    ('GET /api/content', 'api.get_content_items', 'GET', '/api/content?limit=100', {}),
+    ('GET /api/content?status=review', 'api.get_content_items', 'GET',
+     '/api/content?limit=100&status=review', {}),
+    ('GET /api/content/board', 'api.get_content_board', 'GET', '/api/content/board', {}),
+    ('POST /api/content', 'api.create_content_item', 'POST', '/api/content', {'json': {
+        'title': 'Bench', 'description': 'benchmark', 'contentType': 'blog'}}),
+    ('GET /api/content/<id>', 'api.get_content_item', 'GET', '/api/content/1', {}),
+    ('PUT /api/content/<id>', 'api.update_content_item', 'PUT', '/api/content/1', {
+        'json': lambda n: {'title': f'Bench {n}'}}),
+    ('GET /api/workflows', 'api.get_workflows', 'GET', '/api/workflows', {}),
+    ('POST /api/workflows', 'api.create_workflow', 'POST', '/api/workflows', {'json': {
+        'name': 'Bench', 'contentType': 'bench', 'steps': ['draft', 'review', 'published']}}),
+    ('PUT /api/workflows/<id>', 'api.update_workflow', 'PUT', '/api/workflows/1', {'json': {
+        'name': 'Bench', 'contentType': 'bench', 'steps': ['draft', 'review', 'published']}}),
+]
+
+
+def seed(app, rows):
+    users = max(100, rows // 100)
+    now = datetime.utcnow()
+    statuses = ('draft', 'review', 'approved', 'scheduled', 'published')
+    words = ('quarterly', 'report', 'policy', 'roadmap', 'benefits', 'security', 'launch', 'hiring')
+    with app.app_context():
+        db.create_all()
+        admin = User(username='bench', full_name='Bench Admin', email='bench@example.com',
+                     department='QA', title='Benchmark', role='admin')
+        admin.set_password(PASSWORD)
+        db.session.add(admin)
+        db.session.flush()
+        _insert(User, users, lambda i: {
+            'username': f'user{i}', 'password_hash': '', 'full_name': f'User {i}',
+            'email': f'user{i}@example.com', 'department': f'Dept {i % 20}',
+            'title': 'Engineer', 'role': 'employee'})
+        _insert(Document, rows, lambda i: {
+            'title': f'{words[i % 8]} document {i}', 'description': f'{words[(i * 7) % 8]} notes {i}',
+            'file_name': f'{i}.pdf', 'mime_type': 'application/pdf', 'uploaded_by': 1 + i % users,
+            'created_at': now - timedelta(minutes=i)})
+        _insert(Announcement, rows, lambda i: {
+            'title': f'{words[i % 8]} announcement {i}', 'content': f'{words[(i * 3) % 8]} update {i}',
+            'created_by': 1 + i % users, 'is_important': i % 50 == 0,
+            'created_at': now - timedelta(minutes=i)})
+        _insert(ContentItem, rows, lambda i: {
+            'title': f'Content {i}', 'description': 'benchmark', 'content_type': ('blog', 'social', 'product')[i % 3],
+            'status': statuses[i % 5], 'created_by': 1 + i % users, 'assigned_to': 1 + (i * 7) % users,
+            'created_at': now - timedelta(minutes=i), 'updated_at': now - timedelta(minutes=i)})
+        db.session.commit()
+
+        from app import search
+        search.ensure_index(rebuild=True)
+
+
+def _insert(model, count, make_row):
+    for start in range(0, count, SEED_BATCH):
+        db.session.execute(db.insert(model), [make_row(i) for i in range(start, min(count, start + SEED_BATCH))])
+
+
+class RSSSampler:
+    """Samples resident memory on a background thread; ``peak`` is since the last reset."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def current(self):
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * self._page_size
+        except OSError:
+            # No /proc: fall back to the process-wide high-water mark (KiB on Linux, bytes on macOS)
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    def reset(self):
+        self.peak = self.current()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def stop(self):
+        self._stop.set()
+
+
+def make_client(app, anonymous):
+    client = app.test_client()
+    if not anonymous:
+        response = client.post('/api/login', json={'username': 'bench', 'password': PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f'login failed with {response.status_code}')
+    return client
+
+
+def call(client, method, path, options, n):
+    kwargs = {key: value(n) if callable(value) else value
+              for key, value in options.items() if key != 'anonymous'}
+    if callable(path):
+        path = path(n)
+    start = time.perf_counter()
+    response = client.open(path, method=method, **kwargs)
+    response.get_data()
+    elapsed = time.perf_counter() - start
+    match = SQL_TIMING.search(', '.join(response.headers.getlist('Server-Timing')))
+    response.close()
+    return elapsed, response.status_code, int(match.group(1)) if match else None
+
+
+def run_case(app, case, args, sampler, counter):
+    name, endpoint, method, path, options = case
+    anonymous = options.get('anonymous', False)
+
+    def numbered():
+        return next(counter)
+
+    client = make_client(app, anonymous)
+    for _ in range(args.warmup):
+        call(client, method, path, options, numbered())
+
+    sampler.reset()
+    latencies, statuses, queries = [], Counter(), []
+    for _ in range(args.requests):
+        elapsed, status, sql = call(client, method, path, options, numbered())
+        latencies.append(elapsed)
+        statuses[status] += 1
+        if sql is not None:
+            queries.append(sql)
+
+    clients = [make_client(app, anonymous) for _ in range(args.threads)]
+    per_thread = max(1, args.requests // args.threads)
+
+    def worker(thread_client):
+        return [call(thread_client, method, path, options, numbered()) for _ in range(per_thread)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = [result for batch in pool.map(worker, clients) for result in batch]
+    wall = time.perf_counter() - start
+    for _, status, _ in results:
+        statuses[status] += 1
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status >= 500)
+    return {
+        'endpoint': endpoint,
+        'requests': len(latencies) + len(results),
+        'status': dict(sorted((str(status), count) for status, count in statuses.items())),
+        'errors': errors,
+        'p50_ms': _percentile(latencies, 50),
+        'p95_ms': _percentile(latencies, 95),
+        'p99_ms': _percentile(latencies, 99),
+        'req_per_s': len(results) / wall if wall else 0,
+        'sql_queries': statistics.median(queries) if queries else None,
+        'peak_rss_mb': sampler.peak / 2 ** 20,
+    }
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] * 1000
+
+
+def run(args):
+    rows = SIZES[args.size]
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    fresh = not os.path.exists(db_path)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.abspath(db_path)}'
+        DOCUMENT_STORAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'documents')
+        METRICS_ENABLED = True
+        # Report query counts rather than logging a warning per request
+        N_PLUS_ONE_THRESHOLD = 0
+        CONTENT_SCHEDULER_ENABLED = False
+        # Login, register and contact are measured, not throttled
+        RATE_LIMIT_ENABLED = False
+
+    app = create_app(BenchConfig)
+    if fresh:
+        print(f'seeding {rows} rows into {db_path} ...', file=sys.stderr)
+        started = time.perf_counter()
+        seed(app, rows)
+        print(f'seeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    else:
+        print(f'reusing {db_path}', file=sys.stderr)
+
+    setup = make_client(app, anonymous=False)
+    setup.get('/admin/init-financial-data')
+    setup.put('/api/documents/1/content', data=b'%PDF benchmark\n' * 1024, content_type='application/pdf')
+    setup.post('/api/workflows', json={'name': 'Bench', 'contentType': 'bench', 'steps': ['draft', 'published']})
+
+    cases = [case for case in CASES if not args.routes or re.search(args.routes, case[0])]
+    covered = {case[1] for case in CASES} | set(SKIP)
+    missing = sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered)
+    if missing:
+        print('WARNING: no benchmark case for ' + ', '.join(missing), file=sys.stderr)
+
+    sampler = RSSSampler()
+    counter = itertools.count(1)
+    results = {}
+    for case in cases:
+        results[case[0]] = run_case(app, case, args, sampler, counter)
+        print(_row(case[0], results[case[0]]), file=sys.stderr)
+    sampler.stop()
+
+    return {
+        'meta': {
+            'size': args.size, 'rows': rows, 'requests': args.requests, 'threads': args.threads,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'commit': _git_commit(), 'timestamp': datetime.utcnow().isoformat() + 'Z',
+        },
+        'skipped': SKIP,
+        'routes': results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+COLUMNS = ('p50_ms', 'p95_ms', 'p99_ms', 'req_per_s', 'sql_queries', 'peak_rss_mb')
+
+
+def _row(name, result):
+    values = ''.join(f'{result[column]:>12.1f}' if result[column] is not None else f"{'-':>12}"
+                     for column in COLUMNS)
+    return f'{name:<44}{values}{result["errors"]:>8}'
+
+
+def print_table(results):
+    print(f"{'route':<44}" + ''.join(f'{column:>12}' for column in COLUMNS) + f"{'errors':>8}")
+    for name, result in results['routes'].items():
+        print(_row(name, result))
+    for endpoint, reason in results['skipped'].items():
+        print(f'{endpoint:<44}skipped: {reason}')
+
+
+def print_comparison(base, new):
+    print(f"baseline {base['meta'].get('commit')} ({base['meta']['size']}) -> "
+          f"{new['meta'].get('commit')} ({new['meta']['size']})")
+    print(f"{'route':<44}" + ''.join(f'{column:>16}' for column in COLUMNS))
+    for name, result in new['routes'].items():
+        before = base['routes'].get(name)
+        if before is None:
+            print(f'{name:<44}new')
+            continue
+        cells = []
+        for column in COLUMNS:
+            old, value = before[column], result[column]
+            if old is None or value is None:
+                cells.append(f"{'-':>16}")
+            elif old == 0:
+                cells.append(f"{value:>8.1f} {'+0%' if value == 0 else 'n/a':>6}")
+            else:
+                cells.append(f'{value:>8.1f} {(value - old) / old:+6.0%}')
+        print(f'{name:<44}' + ''.join(cells))
+    for name in base['routes'].keys() - new['routes'].keys():
+        print(f'{name:<44}removed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=SIZES, default='1k')
+    parser.add_argument('--db', help='SQLite file to seed once and reuse')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--routes', help='regular expression selecting route names')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help='baseline results, or a baseline and a second result file to compare')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error('--compare takes one or two files')
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as base, open(args.compare[1]) as new:
+            print_comparison(json.load(base), json.load(new))
+        return
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    print_table(results)
+    if args.compare:
+        with open(args.compare[0]) as base:
+            print()
+            print_comparison(json.load(base), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""HTTP throughput: the development server vs the gunicorn production setup.
+
+Run from python-backend/:
+
+    python benchmarks/serving_throughput.py --clients 16 --seconds 10
+
+Each mode serves the same temporary database seeded with documents.  The
+``dev-debug`` mode is the old ``app.run(debug=True)`` entry point, ``dev``
+is ``python main.py`` without the debugger and ``gunicorn`` uses
+gunicorn.conf.py (pass ``--workers`` to override WEB_CONCURRENCY).  Client
+threads keep one HTTP/1.1 connection each and log in first, so the numbers
+include session handling and the SQL behind ``--path``.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = {
+    'dev-debug': ([sys.executable, 'main.py'], {'FLASK_DEBUG': '1'}),
+    'dev': ([sys.executable, 'main.py'], {'FLASK_DEBUG': '0'}),
+    'gunicorn': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+                 {'GUNICORN_ACCESS_LOG': ''}),
+}
+
+
+def seed(path, rows):
+    os.environ['SQLITE_DATABASE_PATH'] = path
+    sys.path.append('.')
+    from app import create_app, db
+    from app.models import Document, User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', full_name='Bench', email='b@example.com',
+                    department='QA', title='Bench', role='employee')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(db.insert(Document), [{
+            'title': f'Document {i}', 'description': 'benchmark', 'file_name': f'{i}.pdf',
+            'mime_type': 'application/pdf', 'uploaded_by': user.id} for i in range(rows)])
+        db.session.commit()
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def login(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/api/login', json.dumps({'username': 'bench', 'password': 'bench'}),
+                       {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    if response.status != 200:
+        raise RuntimeError(f'login failed with {response.status}')
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def run_mode(mode, port, db_path, args):
+    command, extra_env = MODES[mode]
+    env = dict(os.environ, PORT=str(port), SQLITE_DATABASE_PATH=db_path, **extra_env)
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    try:
+        wait_for_port(port)
+        cookie = login(port)
+        stop = threading.Event()
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def client():
+            local = []
+            failed = 0
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', args.path, headers={'Cookie': cookie})
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                    else:
+                        local.append(time.perf_counter() - start)
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            connection.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    latencies.sort()
+    return {
+        'req/s': len(latencies) / args.seconds,
+        'errors': errors[0],
+        'p50 ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p99 ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--path', default='/api/documents?limit=50')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--modes', default=','.join(MODES))
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    seed(db_path, args.rows)
+
+    results = {}
+    for offset, mode in enumerate(args.modes.split(',')):
+        results[mode] = run_mode(mode, args.port + offset, db_path, args)
+    columns = list(next(iter(results.values())))
+    print(f"{'mode':<12}" + ''.join(f'{column:>12}' for column in columns))
+    for mode, result in results.items():
+        print(f'{mode:<12}' + ''.join(f'{result[column]:>12.1f}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Read throughput under concurrent writes: default SQLite vs the production profile.
+
+Run from python-backend/:
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 10
+
+Each mode gets a fresh temporary database seeded with documents.  Reader
+threads page through /api/documents' keyset query while writer threads
+commit contact-form rows, which is the contention pattern the production
+profile is meant to fix.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append('.')
+from config import Config
+from app import create_app, db
+from app.models import ContactForm, Document, User
+
+
+def run_mode(production, args):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLITE_PRODUCTION = production
+        SQLITE_READ_POOL_SIZE = args.readers
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{
+            'username': 'bench', 'password_hash': '', 'full_name': 'Bench', 'email': 'b@example.com',
+            'department': 'QA', 'title': 'Bench', 'role': 'employee'}])
+        db.session.execute(db.insert(Document), [{
+            'title': f'Document {i}', 'description': 'benchmark', 'file_name': f'{i}.pdf',
+            'mime_type': 'application/pdf', 'uploaded_by': 1} for i in range(args.rows)])
+        db.session.commit()
+
+    stop = threading.Event()
+    latencies = []
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        with app.app_context():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    db.session.execute(
+                        db.select(Document.id, Document.title, Document.created_at)
+                        .order_by(Document.created_at, Document.id).limit(100)).all()
+                    local.append(time.perf_counter() - start)
+                except Exception:
+                    with lock:
+                        counts['errors'] += 1
+                finally:
+                    db.session.remove()
+        with lock:
+            latencies.extend(local)
+            counts['reads'] += len(local)
+
+    def writer():
+        done = 0
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    db.session.add(ContactForm(name='Bench', email='b@example.com',
+                                               subject='Load', message='x' * 200))
+                    db.session.commit()
+                    done += 1
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        counts['errors'] += 1
+                finally:
+                    db.session.remove()
+        with lock:
+            counts['writes'] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'reads/s': counts['reads'] / args.seconds,
+        'writes/s': counts['writes'] / args.seconds,
+        'errors': counts['errors'],
+        'read p50 ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'read p99 ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {'default': run_mode(False, args), 'production': run_mode(True, args)}
+    columns = list(results['default'])
+    print(f"{'mode':<12}" + ''.join(f'{column:>14}' for column in columns))
+    for mode, result in results.items():
+        print(f'{mode:<12}' + ''.join(f'{result[column]:>14.1f}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 from datetime import timedelta
 import logging
@@ -13,7 +14,140 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{sqlite_path}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
-    
+
+    # Keyset pagination for the JSON list endpoints
+    API_DEFAULT_PAGE_SIZE = int(os.environ.get('API_DEFAULT_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+    # Unpaginated lists larger than this are streamed in chunks
+    API_STREAM_THRESHOLD = int(os.environ.get('API_STREAM_THRESHOLD', 5000))
+    API_STREAM_CHUNK_SIZE = int(os.environ.get('API_STREAM_CHUNK_SIZE', 1000))
+
+    # Upper bound on how long a worker may serve a financials snapshot that
+    # another process has already invalidated
+    FINANCIALS_CACHE_TTL = int(os.environ.get('FINANCIALS_CACHE_TTL', 300))
+
+    # Employee typeahead index: workers rebuild it in the background after
+    # DIRECTORY_INDEX_TTL seconds to pick up other processes' changes, and
+    # cache up to DIRECTORY_CACHE_SIZE query results in between
+    DIRECTORY_INDEX_TTL = int(os.environ.get('DIRECTORY_INDEX_TTL', 300))
+    DIRECTORY_CACHE_SIZE = int(os.environ.get('DIRECTORY_CACHE_SIZE', 1024))
+    DIRECTORY_SEARCH_LIMIT = int(os.environ.get('DIRECTORY_SEARCH_LIMIT', 10))
+
+    # Query/response cache: an in-process LRU of CACHE_LOCAL_SIZE entries
+    # kept CACHE_LOCAL_TTL seconds, plus an optional shared tier at
+    # CACHE_STORAGE_URL ("redis://..." needs the redis package, "memory://"
+    # is an in-process stand-in) whose entries live CACHE_SHARED_TTL seconds.
+    # Off unless there is a shared tier: per-process tag versions would let a
+    # worker serve a list from before another worker's write for up to
+    # CACHE_LOCAL_TTL seconds
+    CACHE_STORAGE_URL = os.environ.get('CACHE_STORAGE_URL', '')
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '1' if CACHE_STORAGE_URL else '').lower() in ('1', 'true', 'yes')
+    CACHE_LOCAL_SIZE = int(os.environ.get('CACHE_LOCAL_SIZE', 2048))
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 30))
+    CACHE_SHARED_TTL = int(os.environ.get('CACHE_SHARED_TTL', 300))
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'portal:')
+
+    # Flask-Login user loader cache (entries, seconds); size 0 disables it.
+    # Writes evict only in the worker that made them, so another worker can
+    # keep serving a demoted or deleted user's role for up to USER_CACHE_TTL;
+    # keep it short, it is the window for authorization changes
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 10))
+
+    # Content pipeline: items per board column, and how long a worker may
+    # serve cached workflow steps that another process has changed
+    CONTENT_BOARD_LIMIT = int(os.environ.get('CONTENT_BOARD_LIMIT', 20))
+    CONTENT_WORKFLOW_CACHE_TTL = int(os.environ.get('CONTENT_WORKFLOW_CACHE_TTL', 300))
+
+    # Background publishing of scheduled items and overdue notices.  Enabled
+    # processes elect one runner through a lock file (relative to the instance
+    # folder).  POLL (seconds) picks up items changed by other processes;
+    # RESYNC (seconds, 0 = never) reloads all deadlines to catch bulk SQL
+    CONTENT_SCHEDULER_ENABLED = os.environ.get('CONTENT_SCHEDULER_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    CONTENT_SCHEDULER_BATCH_SIZE = int(os.environ.get('CONTENT_SCHEDULER_BATCH_SIZE', 500))
+    CONTENT_SCHEDULER_POLL = int(os.environ.get('CONTENT_SCHEDULER_POLL', 5))
+    CONTENT_SCHEDULER_RESYNC = int(os.environ.get('CONTENT_SCHEDULER_RESYNC', 3600))
+    CONTENT_SCHEDULER_LOCK = os.environ.get('CONTENT_SCHEDULER_LOCK', 'content-scheduler.lock')
+
+    # Document bodies: content-addressed store (relative to the instance
+    # folder), streaming chunk size and upload limit in bytes, and how long
+    # `flask documents-gc` keeps an unreferenced blob (must exceed the
+    # slowest upload).  Set USE_X_SENDFILE when a front-end server (nginx,
+    # Apache) serves the files
+    DOCUMENT_STORAGE_PATH = os.environ.get('DOCUMENT_STORAGE_PATH', 'data/documents')
+    DOCUMENT_CHUNK_SIZE = int(os.environ.get('DOCUMENT_CHUNK_SIZE', 1024 * 1024))
+    DOCUMENT_MAX_SIZE = int(os.environ.get('DOCUMENT_MAX_SIZE', 4 * 1024 ** 3))
+    DOCUMENT_GC_GRACE = int(os.environ.get('DOCUMENT_GC_GRACE', 86400))
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0').lower() in ('1', 'true', 'yes')
+
+    # Rendered marketing pages served to anonymous visitors (entries,
+    # seconds in memory, browser/proxy max-age) and the Jinja bytecode cache
+    # directory, relative to the instance folder ('' disables it)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 256))
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 86400))
+    PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 3600))
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR', 'jinja-cache')
+
+    # Contact form: optional write-behind buffer flushed as one INSERT every
+    # FLUSH_MS or MAX_ROWS rows, spooled to disk if the flush fails, and
+    # suppression of identical submissions within DEDUP_WINDOW seconds
+    CONTACT_BUFFER_ENABLED = os.environ.get('CONTACT_BUFFER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    CONTACT_BUFFER_FLUSH_MS = int(os.environ.get('CONTACT_BUFFER_FLUSH_MS', 250))
+    CONTACT_BUFFER_MAX_ROWS = int(os.environ.get('CONTACT_BUFFER_MAX_ROWS', 500))
+    CONTACT_DEDUP_WINDOW = int(os.environ.get('CONTACT_DEDUP_WINDOW', 600))
+    CONTACT_SPOOL_PATH = os.environ.get('CONTACT_SPOOL_PATH', 'contact-spool')
+
+    # Rate limits for unsafe methods, per endpoint: "<key>=<count>/<seconds>"
+    # rules where key is "ip" or a JSON/form field; an empty string turns an
+    # endpoint's limit off.  A redis:// RATE_LIMIT_STORAGE_URL shares the
+    # buckets between workers (needs the redis package)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    RATE_LIMITS = {
+        'auth.login': os.environ.get('RATE_LIMIT_LOGIN', 'ip=30/60, username=10/300'),
+        'auth.register': os.environ.get('RATE_LIMIT_REGISTER', 'ip=20/3600'),
+        'main.contact': os.environ.get('RATE_LIMIT_CONTACT', 'ip=5/60, email=5/3600'),
+    }
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))  # per rule
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL', '')
+
+    # Password hashing: werkzeug method string (e.g. "scrypt:32768:8:1" or
+    # "pbkdf2:sha256:600000"); existing hashes are upgraded on next login.
+    # Hashing runs in a process pool of PASSWORD_HASH_WORKERS (0 = inline);
+    # requests beyond workers + queue size get a 503 with Retry-After.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 16))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+    # Optional cheaper method for bulk-imported initial passwords; they are
+    # re-hashed with PASSWORD_HASH_METHOD on the user's first login
+    BULK_IMPORT_HASH_METHOD = os.environ.get('BULK_IMPORT_HASH_METHOD')
+
+    # Request latency / SQL histograms, Server-Timing and /metrics.  /metrics
+    # answers only METRICS_ALLOWED_IPS (comma-separated addresses or CIDRs,
+    # loopback by default; behind a proxy this needs ProxyFix) or requests
+    # sending "Authorization: Bearer <METRICS_TOKEN>".  Under gunicorn also
+    # set PROMETHEUS_MULTIPROC_DIR (needs prometheus_client) so a scrape
+    # covers every worker
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1, ::1')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+    # Flag requests that run one statement shape more than this many times
+    # (raises under TESTING, logs a warning otherwise); 0 disables it.  Unset,
+    # it is 10 under TESTING and off everywhere else
+    N_PLUS_ONE_THRESHOLD = (int(os.environ['N_PLUS_ONE_THRESHOLD'])
+                            if os.environ.get('N_PLUS_ONE_THRESHOLD') else None)
+
+    # Production SQLite profile: WAL + pragmas on every connection, one
+    # serialised writer connection and a pool of read-only connections
+    SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION', '').lower() in ('1', 'true', 'yes')
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 8))
+    SQLITE_WRITER_TIMEOUT = int(os.environ.get('SQLITE_WRITER_TIMEOUT', 30))
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+
     # Use PostgreSQL if configured
     if database_type == 'postgres' and os.environ.get('DATABASE_URL'):
         database_url = os.environ.get('DATABASE_URL')
@@ -22,9 +156,9 @@ class Config:
         if database_url.startswith('postgres://'):
             database_url = database_url.replace('postgres://', 'postgresql://', 1)
         
-        # Only use PostgreSQL URL if psycopg2 is available
-        try:
-            import psycopg2
+        # Only use PostgreSQL URL if psycopg2 is available.  find_spec checks
+        # for the driver without importing it; SQLAlchemy loads it on first connect
+        if importlib.util.find_spec('psycopg2') is not None:
             SQLALCHEMY_DATABASE_URI = database_url
             
             # Additional database settings for PostgreSQL
@@ -33,7 +167,7 @@ class Config:
                 "pool_pre_ping": True,
             }
             logging.info("Using PostgreSQL database")
-        except ImportError:
+        else:
             logging.warning("psycopg2 not available, falling back to SQLite")
             logging.info(f"Using SQLite database at {sqlite_path}")
     else:
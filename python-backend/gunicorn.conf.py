@@ -0,0 +1,77 @@
+"""Gunicorn settings for production serving.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is created once in the master (``preload_app``) and forked into the
+workers, so imported modules, templates and config are shared copy-on-write.
+Every setting can be overridden from the environment.  ``kill -HUP <master>``
+starts fresh workers and retires the old ones once they finish their
+in-flight requests; because the app is preloaded, deploying new code needs a
+full restart (or ``kill -USR2`` for a zero-downtime binary upgrade).
+"""
+import glob
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+
+# Sync workers, (2 x cores) + 1, unless WEB_CONCURRENCY says otherwise
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = True
+
+# Recycle each worker after roughly this many requests to bound memory growth;
+# the jitter keeps the workers from restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared
+    # between processes; give each worker its own pools
+    from main import app
+    from app import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Every worker stands by for the scheduler lock from boot, not from its
+    # first request; only the holder runs it
+    from main import app
+    if app.config['CONTENT_SCHEDULER_ENABLED']:
+        from app.scheduler import scheduler
+        scheduler.start()
+
+
+def on_starting(server):
+    # Multiprocess metric files from a previous run would be summed in
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.unlink(path)
+
+
+def worker_exit(server, worker):
+    # Counter increments since the last throttled sync would be lost otherwise
+    from app import metrics
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
@@ -6,6 +6,8 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py main:app`
     # Use port 8080 instead of 5000 to avoid conflicts
     port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
+    debug = os.environ.get("FLASK_DEBUG", "0").lower() in ("1", "true", "yes")
+    app.run(host="0.0.0.0", port=port, debug=debug)
@@ -0,0 +1,136 @@
+"""Baseline schema: the tables as ``db.create_all()`` first created them
+
+An empty database is built with ``flask db upgrade``.  A database created
+earlier with ``db.create_all()`` already has these tables; mark it with
+``flask db stamp 0c5e8a2f4b61`` once, then ``flask db upgrade``.
+
+Revision ID: 0c5e8a2f4b61
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e8a2f4b61'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('contact_form',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('subject', sa.String(length=200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=64), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=True),
+        sa.Column('full_name', sa.String(length=128), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('department', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'))
+    op.create_table('financial_metric',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('icon', sa.String(length=50), nullable=True),
+        sa.Column('display_order', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('revenue_breakdown',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('percentage', sa.Float(), nullable=False),
+        sa.Column('color_class', sa.String(length=50), nullable=True),
+        sa.Column('display_order', sa.Integer(), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('yearly_financial',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('growth_percentage', sa.Float(), nullable=True),
+        sa.Column('profit', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('investor_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('event_date', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('content_workflow',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('content_type', sa.String(length=50), nullable=False),
+        sa.Column('steps', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('document',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=128), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('file_name', sa.String(length=256), nullable=False),
+        sa.Column('mime_type', sa.String(length=64), nullable=False),
+        sa.Column('uploaded_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['uploaded_by'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('announcement',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=128), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_important', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('content_item',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('content_type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('assigned_to', sa.Integer(), nullable=True),
+        sa.Column('deadline', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['assigned_to'], ['user.id']),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_table('content_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['content_id'], ['content_item.id']),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'))
+
+
+def downgrade():
+    for table in ('content_history', 'content_item', 'announcement', 'document', 'content_workflow',
+                  'investor_event', 'yearly_financial', 'revenue_breakdown', 'financial_metric',
+                  'user', 'contact_form'):
+        op.drop_table(table)
@@ -0,0 +1,50 @@
+"""Backfill and require created_at on the keyset-paginated tables
+
+``created_at`` is the first keyset column for documents, announcements and
+content items.  A NULL there ends pagination (the cursor cannot encode it)
+and is skipped by ``created_at > :after``.  Missing values are set to the
+migration time, so those rows sort last.
+
+On SQLite the column change rebuilds the table, which drops its triggers
+(the full-text search ones among them); they are recreated afterwards.
+
+Revision ID: 1b6e8f3a5d72
+Revises: 7f4b1d9e2a60
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6e8f3a5d72'
+down_revision = '7f4b1d9e2a60'
+branch_labels = None
+depends_on = None
+
+TABLES = ('document', 'announcement', 'content_item')
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(f'UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+        _alter_created_at(table, nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        _alter_created_at(table, nullable=True)
+
+
+def _alter_created_at(table, nullable):
+    bind = op.get_bind()
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        triggers = bind.execute(sa.text(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"),
+            {'table': table}).scalars().all()
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+    for sql in triggers:
+        op.execute(sql)
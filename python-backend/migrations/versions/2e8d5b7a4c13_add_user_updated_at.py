@@ -0,0 +1,26 @@
+"""Add updated_at to user
+
+Revision ID: 2e8d5b7a4c13
+Revises: 9b2f6d4e1c37
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e8d5b7a4c13'
+down_revision = '9b2f6d4e1c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE "user" SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,41 @@
+"""Add secondary indexes for list ordering, date filters and foreign keys
+
+Revision ID: 3f1a9c2d7b84
+Revises: 0c5e8a2f4b61
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b84'
+down_revision = '0c5e8a2f4b61'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_document_created_at_id', 'document', ['created_at', 'id']),
+    ('ix_document_uploaded_by', 'document', ['uploaded_by']),
+    ('ix_announcement_created_at_id', 'announcement', ['created_at', 'id']),
+    ('ix_announcement_created_by', 'announcement', ['created_by']),
+    ('ix_financial_metric_display_order', 'financial_metric', ['display_order']),
+    ('ix_revenue_breakdown_display_order', 'revenue_breakdown', ['display_order']),
+    ('ix_yearly_financial_year', 'yearly_financial', ['year']),
+    ('ix_investor_event_event_date', 'investor_event', ['event_date']),
+    ('ix_content_item_status', 'content_item', ['status']),
+    ('ix_content_item_assigned_to', 'content_item', ['assigned_to']),
+    ('ix_content_item_created_by', 'content_item', ['created_by']),
+    ('ix_content_history_content_id', 'content_history', ['content_id']),
+    ('ix_content_history_created_by', 'content_history', ['created_by']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,24 @@
+"""Add a composite year index to revenue_breakdown
+
+Revision ID: 5d7e3a1c9f42
+Revises: 8c4e2b7d1a95
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e3a1c9f42'
+down_revision = '8c4e2b7d1a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_revenue_breakdown_year_order', 'revenue_breakdown',
+                    ['year', 'display_order', 'category', 'percentage'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_revenue_breakdown_year_order', table_name='revenue_breakdown')
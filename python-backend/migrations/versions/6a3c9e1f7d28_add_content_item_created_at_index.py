@@ -0,0 +1,23 @@
+"""Add a (created_at, id) index to content_item for keyset pages
+
+Revision ID: 6a3c9e1f7d28
+Revises: 2e8d5b7a4c13
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3c9e1f7d28'
+down_revision = '2e8d5b7a4c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_content_item_created_at_id', 'content_item', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_content_item_created_at_id', table_name='content_item')
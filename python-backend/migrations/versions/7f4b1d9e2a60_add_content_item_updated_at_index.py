@@ -0,0 +1,23 @@
+"""Index content_item.updated_at for the scheduler's change poll
+
+Revision ID: 7f4b1d9e2a60
+Revises: 6a3c9e1f7d28
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7f4b1d9e2a60'
+down_revision = '6a3c9e1f7d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_content_item_updated_at', 'content_item', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_content_item_updated_at', table_name='content_item')
@@ -0,0 +1,32 @@
+"""Add content hash, size and updated_at to documents
+
+Revision ID: 8c4e2b7d1a95
+Revises: 3f1a9c2d7b84
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7d1a95'
+down_revision = '3f1a9c2d7b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('document', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('document', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('document', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_document_content_hash', 'document', ['content_hash'], unique=False)
+    op.execute('UPDATE document SET updated_at = created_at')
+
+
+def downgrade():
+    op.drop_index('ix_document_content_hash', table_name='document')
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('size')
+        batch_op.drop_column('content_hash')
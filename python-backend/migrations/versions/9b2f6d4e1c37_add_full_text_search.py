@@ -0,0 +1,62 @@
+"""Add the full-text search index for documents and announcements
+
+SQLite gets FTS5 external-content tables kept in sync by triggers, filled
+from the existing rows; PostgreSQL gets a generated ``tsvector`` column with
+a GIN index.  Adding the stored column rewrites the table under an exclusive
+lock, so run this during a maintenance window on large tables.
+
+Revision ID: 9b2f6d4e1c37
+Revises: 5d7e3a1c9f42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2f6d4e1c37'
+down_revision = '5d7e3a1c9f42'
+branch_labels = None
+depends_on = None
+
+# table -> (title column, body column); mirrors app.search.SOURCES
+SOURCES = {
+    'document': ('title', 'description'),
+    'announcement': ('title', 'content'),
+}
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, (title, body) in SOURCES.items():
+        if postgres:
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+                f"setweight(to_tsvector('english', coalesce({body}, '')), 'B')) STORED")
+            op.execute(f'CREATE INDEX ix_{table}_search_vector ON {table} USING GIN (search_vector)')
+            continue
+        fts = f'{table}_fts'
+        new_row = f'INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body});'
+        old_row = (f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) "
+                   f"VALUES ('delete', old.id, old.{title}, old.{body});")
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                   f"{title}, {body}, content='{table}', content_rowid='id')")
+        op.execute(f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {new_row} END')
+        op.execute(f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {old_row} END')
+        op.execute(f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN {old_row} {new_row} END')
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table in reversed(list(SOURCES)):
+        if postgres:
+            op.execute(f'DROP INDEX ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN search_vector')
+            continue
+        fts = f'{table}_fts'
+        for suffix in ('au', 'ad', 'ai'):
+            op.execute(f'DROP TRIGGER {fts}_{suffix}')
+        op.execute(f'DROP TABLE {fts}')
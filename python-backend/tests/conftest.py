@@ -0,0 +1,47 @@
+import pytest
+
+from app import content, create_app, db, user_cache
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        DOCUMENT_STORAGE_PATH = str(tmp_path / 'documents')
+        JINJA_BYTECODE_CACHE_DIR = ''
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        PASSWORD_HASH_WORKERS = 0
+        RATE_LIMIT_ENABLED = False
+        CONTENT_SCHEDULER_ENABLED = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    # Process-wide caches outlive the previous test's database
+    user_cache.clear()
+    content.invalidate()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def login(app):
+    def login(username='admin', role='admin'):
+        client = app.test_client()
+        response = client.post('/api/register', json={
+            'username': username, 'password': 'secret', 'fullName': username.title(),
+            'email': f'{username}@example.com', 'department': 'IT', 'title': 'Staff',
+            'role': role})
+        assert response.status_code == 201, response.data
+        return client
+    return login
+
+
+@pytest.fixture
+def client(login):
+    return login()
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+
+from app import content, db
+from app.models import ContentHistory, ContentItem
+
+
+def test_check_transition_allows_one_step_forward_or_any_step_back():
+    workflow = content.Workflow(['draft', 'review', 'approved', 'published'])
+    workflow.check_transition('draft', 'review')
+    workflow.check_transition('approved', 'draft')
+    workflow.check_transition('review', 'review')
+    with pytest.raises(content.WorkflowError):
+        workflow.check_transition('draft', 'approved')
+    with pytest.raises(content.WorkflowError):
+        workflow.check_transition('draft', 'archived')
+
+
+def test_new_items_must_start_at_the_initial_step(client):
+    response = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog',
+                                                 'status': 'published'})
+    assert response.status_code == 400
+    response = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog'})
+    assert response.status_code == 201
+    assert response.get_json()['status'] == 'draft'
+
+
+def test_status_changes_follow_the_workflow(client):
+    item = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog'}).get_json()
+    url = f"/api/content/{item['id']}"
+    assert client.put(url, json={'status': 'approved'}).status_code == 400
+    assert client.put(url, json={'status': 'review'}).get_json()['status'] == 'review'
+    detail = client.get(url).get_json()
+    assert [entry['status'] for entry in detail['history']] == ['draft', 'review']
+
+
+def test_changing_type_keeps_a_shared_step_and_resets_otherwise(client):
+    client.post('/api/workflows', json={'name': 'Social', 'contentType': 'social',
+                                        'steps': ['idea', 'review', 'live']})
+    item = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog'}).get_json()
+    url = f"/api/content/{item['id']}"
+    client.put(url, json={'status': 'review'})
+
+    # 'review' exists in both workflows, so the move to 'live' is one step
+    moved = client.put(url, json={'contentType': 'social', 'status': 'live'}).get_json()
+    assert (moved['contentType'], moved['status']) == ('social', 'live')
+    # 'live' is not a blog step: the item starts the blog workflow over
+    reset = client.put(url, json={'contentType': 'blog', 'status': 'published'})
+    assert reset.status_code == 400
+    reset = client.put(url, json={'contentType': 'blog'}).get_json()
+    assert reset['status'] == 'draft'
+
+
+def test_only_the_creator_or_an_admin_may_edit(client, login):
+    item = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog'}).get_json()
+    other = login('other', role='employee')
+    assert other.put(f"/api/content/{item['id']}", json={'title': 'Mine'}).status_code == 403
+    assert client.put(f"/api/content/{item['id']}", json={'title': 'Ours'}).status_code == 200
+
+
+def test_duplicate_workflow_for_a_type_is_rejected(client):
+    body = {'name': 'Blog', 'contentType': 'blog', 'steps': ['draft', 'done']}
+    assert client.post('/api/workflows', json=body).status_code == 201
+    assert client.post('/api/workflows', json=body).status_code == 409
+
+
+def test_deadlines_are_stored_as_naive_utc(client):
+    response = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog',
+                                                 'deadline': '2026-10-18T12:00:00+02:00'})
+    assert response.get_json()['deadline'] == '2026-10-18T10:00:00'
+    response = client.post('/api/content', json={'title': 'Post', 'contentType': 'blog',
+                                                 'deadline': 'tomorrow'})
+    assert response.status_code == 400
+
+
+def test_board_counts_every_item_but_lists_only_the_limit(app, client):
+    with app.app_context():
+        statuses = ['draft'] * 5 + ['review'] * 2 + ['published']
+        db.session.add_all(ContentItem(title=f'Item {i}', content_type='blog', status=status,
+                                       created_by=1, updated_at=datetime(2026, 1, 1, 0, i))
+                           for i, status in enumerate(statuses))
+        db.session.add(ContentItem(title='Social', content_type='social', status='draft',
+                                   created_by=1))
+        db.session.commit()
+
+    board = {column['status']: column
+             for column in client.get('/api/content/board?limit=3&type=blog').get_json()}
+    assert list(board) == list(content.DEFAULT_STEPS)
+    assert {status: column['count'] for status, column in board.items()} == {
+        'draft': 5, 'review': 2, 'approved': 0, 'scheduled': 0, 'published': 1}
+    # Freshest first, at most ``limit`` per column
+    assert [item['title'] for item in board['draft']['items']] == ['Item 4', 'Item 3', 'Item 2']
+    assert len(board['review']['items']) == 2
+
+    everything = client.get('/api/content/board?limit=3').get_json()
+    assert sum(column['count'] for column in everything) == 9
@@ -0,0 +1,63 @@
+import os
+import time
+
+from app import document_store
+
+
+def _document(client, title):
+    response = client.post('/api/documents', json={'title': title, 'fileName': f'{title}.txt',
+                                                   'mimeType': 'text/plain'})
+    return response.get_json()['id']
+
+
+def _sweep(app, grace):
+    return app.test_cli_runner().invoke(args=['documents-gc', '--grace', str(grace)]).output
+
+
+def test_upload_download_and_delete_with_a_shared_blob(app, client):
+    first, second = _document(client, 'first'), _document(client, 'second')
+    uploads = [client.put(f'/api/documents/{id}/content', data=b'same bytes').get_json()
+               for id in (first, second)]
+    digest = uploads[0]['contentHash']
+    assert uploads[1]['contentHash'] == digest
+    assert uploads[0]['size'] == 10
+
+    download = client.get(f'/api/documents/{second}/content')
+    assert download.status_code == 200
+    assert download.data == b'same bytes'
+    assert download.headers['ETag'] == f'"{digest}"'
+    download.close()
+
+    # Deleting one document leaves the blob for the other, even after a sweep
+    assert client.delete(f'/api/documents/{first}').status_code == 204
+    assert 'Removed 0' in _sweep(app, 0)
+    assert client.get(f'/api/documents/{second}/content').data == b'same bytes'
+
+    assert client.delete(f'/api/documents/{second}').status_code == 204
+    assert 'Removed 1' in _sweep(app, 0)
+    with app.app_context():
+        assert not document_store.exists(digest)
+
+
+def test_sweep_keeps_unreferenced_blobs_within_the_grace_period(app, client):
+    document = _document(client, 'doc')
+    digest = client.put(f'/api/documents/{document}/content', data=b'v1').get_json()['contentHash']
+    client.put(f'/api/documents/{document}/content', data=b'v2')
+    assert 'Removed 0' in _sweep(app, 3600)
+
+    with app.app_context():
+        path = document_store.path(digest)
+    # Re-uploading identical bytes restarts the grace period
+    os.utime(path, (time.time() - 7200,) * 2)
+    other = _document(client, 'other')
+    client.put(f'/api/documents/{other}/content', data=b'v1')
+    assert os.stat(path).st_mtime > time.time() - 60
+    assert 'Removed 0' in _sweep(app, 3600)
+
+
+def test_conditional_download(client):
+    document = _document(client, 'doc')
+    digest = client.put(f'/api/documents/{document}/content', data=b'body').get_json()['contentHash']
+    response = client.get(f'/api/documents/{document}/content',
+                          headers={'If-None-Match': f'"{digest}"'})
+    assert response.status_code == 304
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import ContentHistory, ContentItem
+from app.scheduler import OVERDUE, PUBLISH, ContentScheduler
+
+
+@pytest.fixture
+def scheduler(app):
+    # Driven by hand: no thread, no election
+    with app.app_context():
+        yield ContentScheduler()
+
+
+def _item(status, deadline, **fields):
+    item = ContentItem(title='Item', content_type='blog', status=status, deadline=deadline,
+                       created_by=1, **fields)
+    db.session.add(item)
+    db.session.commit()
+    return item.id
+
+
+def _history(item_id, status):
+    return db.session.scalars(db.select(ContentHistory).where(
+        ContentHistory.content_id == item_id, ContentHistory.status == status)).all()
+
+
+def test_resync_plans_publish_and_overdue(client, scheduler):
+    past = datetime.utcnow() - timedelta(minutes=5)
+    scheduled = _item('scheduled', past)
+    draft = _item('draft', past)
+    _item('published', past)
+    _item('draft', None)
+
+    scheduler.resync()
+    assert {item_id: kind for item_id, (_, kind) in scheduler._due.items()} == {
+        scheduled: PUBLISH, draft: OVERDUE}
+
+
+def test_publish_fires_once(client, scheduler):
+    item_id = _item('scheduled', datetime.utcnow() - timedelta(seconds=1))
+    scheduler._fire([(item_id, PUBLISH)])
+    scheduler._fire([(item_id, PUBLISH)])
+
+    assert db.session.get(ContentItem, item_id).status == 'published'
+    assert len(_history(item_id, 'published')) == 1
+    assert scheduler.fired == 1
+
+
+def test_overdue_is_flagged_once_per_deadline(client, scheduler):
+    deadline = datetime.utcnow() - timedelta(seconds=1)
+    item_id = _item('review', deadline)
+    scheduler._fire([(item_id, OVERDUE)])
+    # A second scheduler (or a replayed batch) must not flag it again
+    ContentScheduler()._fire([(item_id, OVERDUE)])
+    assert len(_history(item_id, OVERDUE)) == 1
+
+    scheduler.resync()
+    assert item_id not in scheduler._due
+
+    # A new deadline that passes is a new notice
+    item = db.session.get(ContentItem, item_id)
+    item.deadline = datetime.utcnow()
+    db.session.commit()
+    scheduler._fire([(item_id, OVERDUE)])
+    assert len(_history(item_id, OVERDUE)) == 2
+
+
+def test_moved_deadline_is_requeued_not_fired(client, scheduler):
+    item_id = _item('scheduled', datetime.utcnow() + timedelta(days=1))
+    scheduler._fire([(item_id, PUBLISH)])
+    assert db.session.get(ContentItem, item_id).status == 'scheduled'
+    assert scheduler._changes and scheduler._changes[0][0] == item_id
+
+
+def test_poll_picks_up_other_processes_changes(client, scheduler):
+    since = datetime.utcnow() - timedelta(seconds=1)
+    item_id = _item('scheduled', datetime.utcnow() + timedelta(hours=1))
+    scheduler.poll(since)
+    assert scheduler._due[item_id][1] == PUBLISH
+
+    db.session.get(ContentItem, item_id).status = 'published'
+    db.session.commit()
+    scheduler.poll(since)
+    assert item_id not in scheduler._due